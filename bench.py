@@ -0,0 +1,278 @@
+"""
+Benchmarks for the hot paths: stepping each engine, seeding random
+boards, rendering frames and saving/loading every file format.
+
+Workloads are the patterns in the library plus seeded random soups at a
+few board sizes and densities, so two runs on the same machine measure
+the same work. Results are written as JSON and can be compared against
+an earlier results file to flag regressions.
+
+Example:
+    python bench.py -o baseline.json
+    python bench.py -o new.json --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import formats
+import patterns
+from engines import available_engines
+from rules import CONWAY
+from simulation import Simulation
+
+# Colours for the render benchmark; any palette does.
+PALETTE = {"primary": "#1e1e2e", "secondary": "#89b4fa", "accent": "#cdd6f4"}
+
+
+def soup(width, height, density, seed):
+    """
+    Returns:
+        dict: A state with each cell alive with the given probability.
+    """
+    rng = random.Random(seed)
+    return {
+        "cell_size": 20,
+        "grid": [(row, col) for row in range(height) for col in range(width) if rng.random() < density],
+        "width": width,
+        "height": height,
+    }
+
+
+def workloads(sizes, densities, seed, library=None):
+    """
+    Lists the boards to benchmark.
+
+    Returns:
+        list: (name, state) pairs; library patterns first, then soups.
+    """
+    library = library or patterns.default_library()
+    boards = [(f"pattern:{name}", dict({"cell_size": 20}, **library.load(name))) for name in library.names()]
+    for size in sizes:
+        for density in densities:
+            boards.append((f"soup:{size}x{size}@{density}", soup(size, size, density, seed)))
+    return boards
+
+
+def timed(run, budget, limit):
+    """
+    Calls run() until the time budget or the call limit is used up.
+
+    Returns:
+        tuple: (calls, seconds), at least one call.
+    """
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while calls < limit and (calls == 0 or elapsed < budget):
+        run()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+
+def bench_steps(boards, engines, generations, budget, rule=None):
+    """Generations per second of every engine on every board."""
+    results = {}
+    for engine in engines:
+        sim = Simulation(engine=engine, rule=rule)
+        try:
+            for name, state in boards:
+                sim.load_state(dict(state, rule=None))
+                sim.step()  # Warm up caches and worker processes.
+                calls, seconds = timed(sim.step, budget, generations)
+                key = f"step/{engine}/{name}" + (f"/{sim.rule}" if sim.rule != CONWAY else "")
+                results[key] = {
+                    "value": calls / seconds, "unit": "gen/s", "higher_is_better": True}
+        finally:
+            sim.engine.close()
+    return results
+
+
+def bench_randomize(sizes, seed, budget):
+    """Time to seed a random board, as the Random button does."""
+    results = {}
+    for size in sizes:
+        sim = Simulation(size, size)
+        rng = random.Random(seed)
+        calls, seconds = timed(lambda: sim.randomize(rng), budget, 50)
+        results[f"randomize/{size}x{size}"] = {
+            "value": seconds / calls * 1000, "unit": "ms", "higher_is_better": False}
+        sim.engine.close()
+    return results
+
+
+def bench_render(boards, cell_size, frames, budget):
+    """
+    Milliseconds per frame of each renderer while a board runs, on a
+    hidden Tk window. The generations are stepped before the clock starts.
+
+    Returns:
+        dict: The results, empty if Tk cannot open a window here.
+    """
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:  # No Tk or no display, e.g. on a server
+        return {}
+    import renderers
+    root.withdraw()
+    canvas = tk.Canvas(root)
+    grid_layer = renderers.GridLayer(canvas, PALETTE)
+    kinds = [renderers.CanvasRenderer]
+    if renderers.ImageRenderer.available():
+        kinds.append(renderers.ImageRenderer)
+
+    results = {}
+    try:
+        for kind in kinds:
+            renderer = kind(canvas, PALETTE, grid_layer)
+            for name, state in boards:
+                sim = Simulation(engine="Sparse")
+                sim.load_state(state)
+                grid_layer.build(sim.width, sim.height, cell_size)
+                renderer.set_geometry(sim.width, sim.height, cell_size, 1)
+                renderer.render(sim.cells())
+                # Stepped beforehand, so only drawing is timed.
+                upcoming = []
+                for _ in range(frames):
+                    sim.step()
+                    upcoming.append(list(sim.cells()))
+                upcoming = iter(upcoming)
+
+                def frame():
+                    renderer.render(next(upcoming))
+                    root.update_idletasks()
+                calls, seconds = timed(frame, budget, frames)
+                results[f"render/{kind.__name__}/{name}"] = {
+                    "value": seconds / calls * 1000, "unit": "ms/frame", "higher_is_better": False}
+            renderer.detach()
+    finally:
+        root.destroy()
+    return results
+
+
+def bench_io(boards, budget):
+    """Save and load throughput of every format, in cells per second."""
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for extension, fmt in formats.EXTENSIONS.items():
+            path = os.path.join(directory, "board" + extension)
+            for name, state in boards:
+                population = max(1, len(state["grid"]))
+                calls, seconds = timed(lambda: formats.save(state, path, fmt), budget, 100)
+                results[f"save/{fmt}/{name}"] = {
+                    "value": population * calls / seconds, "unit": "cells/s", "higher_is_better": True}
+                calls, seconds = timed(lambda: formats.load(path), budget, 100)
+                results[f"load/{fmt}/{name}"] = {
+                    "value": population * calls / seconds, "unit": "cells/s", "higher_is_better": True}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares results with an earlier run.
+
+    Args:
+        results (dict): The "results" of this run.
+        baseline (dict): The "results" of the earlier run.
+        tolerance (float): Slowdown allowed before it counts, 0.1 is 10%.
+
+    Returns:
+        list: (name, old, new, change) of every regression, where change
+            is the slowdown as a fraction.
+    """
+    regressions = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if old is None or not old["value"] or not new["value"]:
+            continue
+        if new["higher_is_better"]:
+            change = old["value"] / new["value"] - 1
+        else:
+            change = new["value"] / old["value"] - 1
+        if change > tolerance:
+            regressions.append((name, old["value"], new["value"], change))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark stepping, rendering and file I/O.")
+    parser.add_argument("-o", "--output", default="bench.json",
+                        help="where to write the results (default: %(default)s)")
+    parser.add_argument("--baseline", help="earlier results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="slowdown allowed against the baseline before it is flagged (default: %(default)s)")
+    parser.add_argument("--sizes", default="64,256,512",
+                        help="soup board sizes, comma separated (default: %(default)s)")
+    parser.add_argument("--densities", default="0.1,0.35",
+                        help="soup densities, comma separated (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the soups (default: %(default)s)")
+    parser.add_argument("-e", "--engine", action="append", choices=available_engines(),
+                        help="engine to benchmark, may be repeated (default: all available)")
+    parser.add_argument("-r", "--rule", default="B3/S23",
+                        help="Life-like rule to step by (default: %(default)s)")
+    parser.add_argument("--generations", type=int, default=200,
+                        help="most generations to time per engine and board (default: %(default)s)")
+    parser.add_argument("--budget", type=float, default=1.0,
+                        help="seconds to spend on each measurement at most, roughly (default: %(default)s)")
+    parser.add_argument("--skip", action="append", default=[], choices=["step", "randomize", "render", "io"],
+                        help="leave out a group of benchmarks, may be repeated")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    densities = [float(density) for density in args.densities.split(",")]
+    boards = workloads(sizes, densities, args.seed)
+
+    results = {}
+    if "step" not in args.skip:
+        results.update(bench_steps(boards, args.engine or available_engines(), args.generations, args.budget,
+                                   args.rule))
+    if "randomize" not in args.skip:
+        results.update(bench_randomize(sizes, args.seed, args.budget))
+    if "render" not in args.skip:
+        rendered = bench_render(boards, 4, 50, args.budget)
+        if not rendered:
+            print("render: skipped, no display", file=sys.stderr)
+        results.update(rendered)
+    if "io" not in args.skip:
+        results.update(bench_io(boards, args.budget))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sizes": sizes,
+        "densities": densities,
+        "seed": args.seed,
+        "rule": args.rule,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    width = max((len(name) for name in results), default=0)
+    for name, result in sorted(results.items()):
+        print(f"{name:{width}}  {result['value']:14.1f} {result['unit']}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.1f} -> {new:.1f} ({change:+.0%} slower)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
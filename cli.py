@@ -0,0 +1,97 @@
+"""
+Command-line runner for the headless simulation core.
+
+Loads a saved state, runs it for a number of generations as fast as the
+chosen engine allows and writes the resulting state plus timing, without
+touching Tkinter or pygame.
+
+Example:
+    python cli.py board.json -n 1000 -o result.json --engine NumPy
+"""
+import argparse
+import json
+import sys
+import time
+from engines import available_engines, default_engine
+from simulation import Simulation
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Game of Life state headlessly.")
+    parser.add_argument("state", help="state file written by the Save button (.json, .gol or .rle)")
+    parser.add_argument("-n", "--generations", type=int, default=100,
+                        help="number of generations to run (default: 100)")
+    parser.add_argument("-o", "--output", help="where to write the resulting state")
+    parser.add_argument("-e", "--engine", default=default_engine(), choices=available_engines(),
+                        help="simulation engine to use (default: %(default)s)")
+    parser.add_argument("-r", "--rule",
+                        help="Life-like rule to run, e.g. B36/S23 (default: the rule saved in the state)")
+    parser.add_argument("--cycles", action="store_true",
+                        help="detect when the board starts repeating and replay the cycle instead of stepping")
+    parser.add_argument("--timing", help="write the timing report as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def run(state_path, generations, engine, output=None, cycles=False, rule=None):
+    """
+    Runs a saved state for a number of generations.
+
+    Args:
+        state_path (str): The state file to load.
+        generations (int): How many generations to run.
+        engine (str): The engine name to step with.
+        output (str, optional): Where to save the resulting state.
+        cycles (bool): Detect cycles and replay them once found.
+        rule (str, optional): Rulestring to run instead of the state's rule.
+
+    Returns:
+        dict: The timing report.
+    """
+    sim = Simulation(engine=engine)
+    sim.load(state_path)
+    if rule:
+        sim.set_rule(rule)
+    if cycles:
+        sim.detect_cycles(True, loop=True)
+    start_population = sim.population()
+
+    start = time.perf_counter()
+    sim.step(generations)
+    elapsed = time.perf_counter() - start
+
+    if output:
+        sim.save(output)
+
+    return {
+        "engine": engine,
+        "rule": sim.rule.string,
+        "width": sim.width,
+        "height": sim.height,
+        "generations": generations,
+        "seconds": elapsed,
+        "generations_per_second": generations / elapsed if elapsed else None,
+        "start_population": start_population,
+        "final_population": sim.population(),
+        "period": sim.cycles.period if cycles else None,
+        "cycle_found_at": sim.cycles.found_at if cycles else None,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args.state, args.generations, args.engine, args.output, args.cycles, args.rule)
+    if args.timing:
+        with open(args.timing, "w") as f:
+            json.dump(report, f, indent=2)
+
+    rate = report["generations_per_second"]
+    print(f"{report['generations']} generations on a {report['width']}x{report['height']} board "
+          f"with {report['engine']} under {report['rule']} in {report['seconds']:.3f}s"
+          + (f" ({rate:.1f} gen/s)" if rate else "")
+          + f", population {report['start_population']} -> {report['final_population']}"
+          + (f", period {report['period']} from generation {report['cycle_found_at']}" if report["period"] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Cycle detection for a running board.
+
+Every cell gets a fixed random 64 bit key, and the hash of a board is the
+XOR of the keys of its live cells (Zobrist hashing). A birth or a death
+flips one key in or out, so the hash is kept up to date from the cells
+that changed in a step, never from the whole board. A small table of
+recent hashes then shows when the board is back in a state it was in p
+generations ago.
+"""
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only needed for the array engines' changes
+    np = None
+
+MASK = (1 << 64) - 1
+GOLDEN = 0x9e3779b97f4a7c15
+MIX1 = 0xbf58476d1ce4e5b9
+MIX2 = 0x94d049bb133111eb
+
+
+def cell_key(row, col):
+    """
+    Returns:
+        int: The 64 bit key of a cell, a splitmix64 hash of its position.
+    """
+    x = ((((row & 0xffffffff) << 32) | (col & 0xffffffff)) + GOLDEN) & MASK
+    x = ((x ^ (x >> 30)) * MIX1) & MASK
+    x = ((x ^ (x >> 27)) * MIX2) & MASK
+    return x ^ (x >> 31)
+
+
+def zobrist(rows, cols):
+    """
+    XORs together the keys of some cells.
+
+    Args:
+        rows (sequence): Row of each cell; a list, or a NumPy array for
+            the array engines.
+        cols (sequence): Column of each cell, in the same order.
+
+    Returns:
+        int: The combined key.
+    """
+    if np is not None and isinstance(rows, np.ndarray):
+        x = ((rows.astype(np.int64) & 0xffffffff).astype(np.uint64) << np.uint64(32))
+        x |= (cols.astype(np.int64) & 0xffffffff).astype(np.uint64)
+        x += np.uint64(GOLDEN)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(MIX1)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(MIX2)
+        x ^= x >> np.uint64(31)
+        return int(np.bitwise_xor.reduce(x)) if x.size else 0
+
+    h = 0
+    for row, col in zip(rows, cols):
+        h ^= cell_key(row, col)
+    return h
+
+
+class CycleDetector:
+    """
+    Keeps the Zobrist hash of a board in step with it and remembers the
+    generation each of the last few hashes was seen at. When a hash comes
+    back, the board has entered a cycle; period is then how many
+    generations it takes to repeat. Two different boards sharing a 64 bit
+    hash is possible in theory but far too rare to matter here.
+
+    Attributes:
+        history (int): How many recent hashes to remember; longer cycles
+            go unnoticed.
+        hash (int): The hash of the board, or None before the first update.
+        period (int): The length of the cycle found, or None.
+        found_at (int): The generation the cycle was found at, or None.
+    """
+    def __init__(self, history=256):
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        """Forgets the board, e.g. after it was edited or loaded."""
+        self.hash = None
+        self.period = None
+        self.found_at = None
+        self._seen = {}
+        self._order = deque()
+
+    def start(self, cells, generation):
+        """
+        Hashes a whole board; only needed once after a reset.
+
+        Args:
+            cells (iterable): The live (row, col) cells.
+            generation (int): The generation of the board.
+        """
+        cells = list(cells)
+        self.hash = zobrist([row for row, _ in cells], [col for _, col in cells])
+        self._remember(generation)
+
+    def update(self, flips, generation):
+        """
+        Applies one generation's births and deaths to the hash.
+
+        Args:
+            flips (tuple): Rows and columns of the cells that changed, as
+                returned by Engine.flips().
+            generation (int): The generation the board is now at.
+
+        Returns:
+            int: The period if this generation closed a cycle, else None.
+        """
+        self.hash ^= zobrist(*flips)
+        seen = self._seen.get(self.hash)
+        self._remember(generation)
+        if seen is not None and self.period is None:
+            self.period = generation - seen
+            self.found_at = generation
+            return self.period
+        return None
+
+    def _remember(self, generation):
+        if len(self._order) >= self.history:
+            old = self._order.popleft()
+            if self._seen.get(old[0]) == old[1]:
+                del self._seen[old[0]]
+        self._seen[self.hash] = generation
+        self._order.append((self.hash, generation))
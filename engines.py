@@ -0,0 +1,663 @@
+"""
+Simulation backends for the Game of Life.
+
+Every engine owns its copy of the board and exposes the same small
+interface, so GameOfLife can swap between them without caring how the
+cells are stored. Converting to and from plain (row, col) cells only
+happens at the edges: loading, saving and drawing.
+"""
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from rules import CONWAY, parse_rule
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the array engine is hidden without it
+    np = None
+
+
+# Relative (row, col) positions of the eight cells around a cell.
+NEIGHBOR_OFFSETS = [(-1, -1), (-1, 0), (-1, 1),
+                    (0, -1),           (0, 1),
+                    (1, -1),  (1, 0),  (1, 1)]
+
+# The sparse engines pack a cell into one int, (row << 32) + col, for rows
+# and columns from -2**31 to 2**31 - 1. A neighbour is then a fixed offset
+# away, and a board is a set of plain ints: less than half the memory of
+# (row, col) tuples, and nothing for the cyclic garbage collector to scan.
+ROW = 1 << 32
+HALF = 1 << 31
+NEIGHBOR_KEYS = tuple(dr * ROW + dc for dr, dc in NEIGHBOR_OFFSETS)
+
+
+def pack(row, col):
+    return (row << 32) + col
+
+
+def unpack(key):
+    row = (key + HALF) >> 32
+    return row, key - (row << 32)
+
+
+class PackedCells:
+    """
+    A read-only view of a set of packed cells that looks like a collection
+    of (row, col) tuples, which are only built while iterating.
+    """
+    __slots__ = ("keys",)
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, cell):
+        row, col = cell
+        return (row << 32) + col in self.keys
+
+    def __iter__(self):
+        for key in self.keys:
+            row = (key + HALF) >> 32
+            yield row, key - (row << 32)
+
+
+class Engine:
+    """
+    Base class for the simulation backends. Unless an engine says
+    otherwise the board is bounded: cells outside width x height are dead
+    and never come to life.
+
+    Attributes:
+        name (str): The label shown in the engine selector.
+        bounded (bool): False if cells live on outside width x height.
+        width (int): Number of columns on the board.
+        height (int): Number of rows on the board.
+        rule (rules.Rule): The rule the board evolves by.
+
+    Methods:
+        available():
+            Tells whether the engine can run with the installed packages.
+
+        set_rule(rule):
+            Switches to another Life-like rule.
+
+        load(cells, width, height):
+            Replaces the board with the given live cells.
+
+        resize(width, height):
+            Changes the board size, keeping the cells that still fit.
+
+        cells():
+            Returns the live cells as (row, col) tuples.
+
+        packed():
+            Returns a new set of the live cells packed into ints, see pack().
+
+        cells_in(top, left, height, width):
+            Returns the live cells inside a rectangle, e.g. the part on screen.
+
+        population():
+            Returns the number of live cells.
+
+        is_alive(row, col):
+            Tells whether a cell is alive.
+
+        set_cell(row, col, alive):
+            Makes a cell alive or dead.
+
+        clear():
+            Kills every cell.
+
+        step(generations):
+            Advances the board by the given number of generations.
+
+        flips():
+            Returns the rows and columns of the cells the last generation changed.
+
+        changed():
+            Returns the same cells as flips(), packed into ints.
+
+        snapshot():
+            Returns an immutable copy of the board that restore() accepts.
+
+        restore(snapshot):
+            Puts the board back to a snapshot taken from the same engine type.
+
+        close():
+            Releases any resources held by the engine.
+    """
+    name = None
+    bounded = True
+    rule = CONWAY
+
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def set_rule(self, rule):
+        """
+        Args:
+            rule (str or rules.Rule): A rulestring such as "B36/S23".
+        """
+        self.rule = parse_rule(rule)
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.height and 0 <= col < self.width
+
+    def load(self, cells, width, height):
+        raise NotImplementedError
+
+    def resize(self, width, height):
+        raise NotImplementedError
+
+    def cells(self):
+        raise NotImplementedError
+
+    def packed(self):
+        return {(row << 32) + col for row, col in self.cells()}
+
+    def cells_in(self, top, left, height, width):
+        bottom = top + height
+        right = left + width
+        return [(row, col) for row, col in self.cells() if top <= row < bottom and left <= col < right]
+
+    def population(self):
+        raise NotImplementedError
+
+    def is_alive(self, row, col):
+        raise NotImplementedError
+
+    def set_cell(self, row, col, alive=True):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def step(self, generations=1):
+        raise NotImplementedError
+
+    def flips(self):
+        """
+        Lists the births and deaths of the last generation stepped, so
+        cycles.CycleDetector can follow the board without rescanning it.
+        Only meaningful straight after step(); edits are not included.
+
+        Returns:
+            tuple: A sequence of rows and a sequence of columns.
+        """
+        raise NotImplementedError
+
+    def changed(self):
+        rows, cols = self.flips()
+        return {(row << 32) + col for row, col in zip(rows, cols)}
+
+    def snapshot(self):
+        return (self.width, self.height, frozenset(self.cells()))
+
+    def restore(self, snapshot):
+        width, height, cells = snapshot
+        self.load(cells, width, height)
+
+    def close(self):
+        pass
+
+
+class SparseEngine(Engine):
+    """
+    Keeps the live cells in a set of packed ints (see pack()) and only
+    visits live cells and their neighbours, so a step costs O(population)
+    instead of O(width * height). Cells left outside the board by a resize
+    are kept but ignored until they fit again, like the original grid dict.
+
+    Attributes:
+        grid (set): The packed live cells.
+    """
+    name = "Sparse"
+
+    def __init__(self):
+        super().__init__()
+        self.grid = set()
+        self._previous = set()
+
+    def load(self, cells, width, height):
+        self.width = width
+        self.height = height
+        in_bounds = self.in_bounds
+        self.grid = {(row << 32) + col for row, col in cells if in_bounds(row, col)}
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    def cells(self):
+        return PackedCells(self.grid)
+
+    def packed(self):
+        return set(self.grid)
+
+    def cells_in(self, top, left, height, width):
+        grid = self.grid
+        if height * width < len(grid):
+            # A small window over a big population: probe the window instead.
+            return [(row, col) for row in range(top, top + height) for col in range(left, left + width)
+                    if (row << 32) + col in grid]
+        return super().cells_in(top, left, height, width)
+
+    def population(self):
+        return len(self.grid)
+
+    def is_alive(self, row, col):
+        return (row << 32) + col in self.grid
+
+    def set_cell(self, row, col, alive=True):
+        if alive:
+            self.grid.add((row << 32) + col)
+        else:
+            self.grid.discard((row << 32) + col)
+
+    def clear(self):
+        self.grid.clear()
+
+    def snapshot(self):
+        return (self.width, self.height, frozenset(self.grid))
+
+    def restore(self, snapshot):
+        self.width, self.height, keys = snapshot
+        self.grid = set(keys)
+
+    def step(self, generations=1):
+        height = self.height
+        width = self.width
+        table = self.rule.table
+        for _ in range(generations):
+            grid = self._previous = self.grid
+            # Cells outside the board neither count nor get counted, which
+            # matches counting neighbours cell by cell on a bounded board.
+            # A live cell adds 9 to its own count, so every count is the
+            # rule table index alive * 9 + neighbours.
+            counts = {}
+            get = counts.get
+            for key in grid:
+                row = (key + HALF) >> 32
+                col = key - (row << 32)
+                if not (0 <= row < height and 0 <= col < width):
+                    continue
+                counts[key] = get(key, 0) + 9
+                if 0 < row < height - 1 and 0 < col < width - 1:
+                    for offset in NEIGHBOR_KEYS:
+                        neighbor = key + offset
+                        counts[neighbor] = get(neighbor, 0) + 1
+                else:
+                    # Only cells on the edge have neighbours off the board.
+                    for dr, dc in NEIGHBOR_OFFSETS:
+                        r = row + dr
+                        c = col + dc
+                        if 0 <= r < height and 0 <= c < width:
+                            neighbor = (r << 32) + c
+                            counts[neighbor] = get(neighbor, 0) + 1
+
+            self.grid = {key for key, index in counts.items() if table[index]}
+
+    def changed(self):
+        return self.grid ^ self._previous
+
+    def flips(self):
+        changed = PackedCells(self.grid ^ self._previous)
+        rows = []
+        cols = []
+        for row, col in changed:
+            rows.append(row)
+            cols.append(col)
+        return rows, cols
+
+
+class UnboundedEngine(SparseEngine):
+    """
+    SparseEngine without edges: the universe is infinite and width and
+    height only describe the home area, used to centre random soups and
+    as the smallest board saved. Cells anywhere keep evolving, so gliders
+    fly on instead of dying at the window edge.
+    """
+    name = "Unbounded"
+    bounded = False
+
+    def in_bounds(self, row, col):
+        return True
+
+    def step(self, generations=1):
+        table = self.rule.table
+        for _ in range(generations):
+            grid = self._previous = self.grid
+            counts = {}
+            get = counts.get
+            for key in grid:
+                counts[key] = get(key, 0) + 9
+                for offset in NEIGHBOR_KEYS:
+                    neighbor = key + offset
+                    counts[neighbor] = get(neighbor, 0) + 1
+
+            self.grid = {key for key, index in counts.items() if table[index]}
+
+
+# Pair tables by rule table, see _pair_table().
+_pair_tables = {}
+
+
+def _pair_table(table):
+    """
+    Widens a rule's 18 entry table to look up two neighbouring cells at
+    once: read as one uint16, two table indices a and b are the index
+    a + 256 * b (or b + 256 * a, depending on byte order), and the entry
+    holds both results in the matching bytes. Half the lookups of a per
+    cell table, which is most of the cost of a step.
+    """
+    pairs = _pair_tables.get(table)
+    if pairs is None:
+        single = np.zeros(256, dtype=np.uint16)
+        single[:len(table)] = np.frombuffer(table, dtype=np.uint8)
+        index = np.arange(1 << 16)
+        pairs = _pair_tables[table] = single[index & 0xff] | (single[index >> 8] << 8)
+    return pairs
+
+
+def _scratch(height, width):
+    """Buffers for _count_and_apply, rounded up to an even width."""
+    even = width + (width & 1)
+    counts = np.zeros((height, even), dtype=np.uint8)
+    alive = np.zeros((height, width), dtype=np.uint8)
+    result = np.zeros((height, even), dtype=np.uint8)
+    return counts, alive, result
+
+
+def _count_and_apply(board, out, pairs, scratch=None):
+    """
+    Writes the next generation of a padded 0/1 board into out, which has
+    two rows and two columns less, by looking every cell up in a rule's
+    table: the index is alive * 9 + live neighbours.
+
+    Args:
+        board (np.ndarray): The padded board.
+        out (np.ndarray): Where to write the next generation.
+        pairs (np.ndarray): The rule's _pair_table().
+        scratch (tuple): Buffers from _scratch() for out's size; made here
+            if not given.
+    """
+    height, width = out.shape
+    counts_even, alive, result_even = scratch or _scratch(height, width)
+    counts = counts_even[:, :width]
+    np.add(board[:-2, :-2], board[:-2, 1:-1], out=counts)
+    counts += board[:-2, 2:]
+    counts += board[1:-1, :-2]
+    counts += board[1:-1, 2:]
+    counts += board[2:, :-2]
+    counts += board[2:, 1:-1]
+    counts += board[2:, 2:]
+    counts += np.multiply(board[1:-1, 1:-1], 9, out=alive)
+    # "clip" skips the bounds check; indices are always in the table.
+    np.take(pairs, counts_even.view(np.uint16), out=result_even.view(np.uint16), mode="clip")
+    out[...] = result_even[:, :width]
+
+
+class ArrayEngine(Engine):
+    """
+    Keeps the board in a NumPy array of 0/1 bytes with a one cell dead
+    border, and computes each generation from eight shifted views of it
+    with no Python loop over cells and one rule table lookup per two
+    cells. Two boards and the scratch buffers are allocated per board
+    size and reused, so stepping does not allocate.
+    """
+    name = "NumPy"
+
+    def __init__(self):
+        super().__init__()
+        self._allocate(0, 0)
+        self.set_rule(self.rule)
+
+    @classmethod
+    def available(cls):
+        return np is not None
+
+    def set_rule(self, rule):
+        super().set_rule(rule)
+        self._pairs = _pair_table(self.rule.table)
+
+    def _allocate(self, width, height):
+        self.width = width
+        self.height = height
+        self._board = np.zeros((height + 2, width + 2), dtype=np.uint8)
+        self._next = np.zeros_like(self._board)
+        self._scratch = _scratch(height, width)
+
+    @property
+    def board(self):
+        """The visible part of the board, without the dead border."""
+        return self._board[1:-1, 1:-1]
+
+    def load(self, cells, width, height):
+        self._allocate(width, height)
+        rows = []
+        cols = []
+        for row, col in cells:
+            if 0 <= row < height and 0 <= col < width:
+                rows.append(row)
+                cols.append(col)
+        self.board[rows, cols] = 1
+
+    def resize(self, width, height):
+        if (width, height) == (self.width, self.height):
+            return
+        old = self.board.copy()
+        self._allocate(width, height)
+        rows = min(height, old.shape[0])
+        cols = min(width, old.shape[1])
+        self.board[:rows, :cols] = old[:rows, :cols]
+
+    def cells(self):
+        rows, cols = np.nonzero(self.board)
+        return zip(rows.tolist(), cols.tolist())
+
+    def packed(self):
+        return set(_pack_array(*np.nonzero(self.board)))
+
+    def cells_in(self, top, left, height, width):
+        top_clip = max(top, 0)
+        left_clip = max(left, 0)
+        rows, cols = np.nonzero(self.board[top_clip:max(top + height, 0), left_clip:max(left + width, 0)])
+        return list(zip((rows + top_clip).tolist(), (cols + left_clip).tolist()))
+
+    def population(self):
+        return int(np.count_nonzero(self.board))
+
+    def is_alive(self, row, col):
+        return self.in_bounds(row, col) and bool(self.board[row, col])
+
+    def set_cell(self, row, col, alive=True):
+        if self.in_bounds(row, col):
+            self.board[row, col] = 1 if alive else 0
+
+    def clear(self):
+        self._board.fill(0)
+
+    def snapshot(self):
+        return (self.width, self.height, self.board.copy())
+
+    def restore(self, snapshot):
+        width, height, board = snapshot
+        if (width, height) != (self.width, self.height):
+            self._allocate(width, height)
+        self.board[:, :] = board
+
+    def step(self, generations=1):
+        for _ in range(generations):
+            _count_and_apply(self._board, self._next[1:-1, 1:-1], self._pairs, self._scratch)
+            self._board, self._next = self._next, self._board
+
+    def flips(self):
+        # After the swap, _next still holds the generation before.
+        return np.nonzero(self.board != self._next[1:-1, 1:-1])
+
+    def changed(self):
+        return _pack_array(*self.flips())
+
+
+def _pack_array(rows, cols):
+    return ((rows.astype(np.int64) << 32) + cols).tolist()
+
+
+# Shared memory blocks a pool worker is attached to, by name.
+_attached = {}
+
+
+def _attach(name):
+    shm = _attached.get(name)
+    if shm is None:
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    return shm
+
+
+def _step_tile(name, width, height, source, start, stop, table):
+    """Pool worker: steps rows start..stop of the shared board in place."""
+    shm = _attach(name)
+    boards = np.ndarray((2, height + 2, width + 2), dtype=np.uint8, buffer=shm.buf)
+    # Padded rows start and stop + 1 are the halo rows owned by the tiles
+    # above and below; they are read straight from shared memory.
+    _count_and_apply(boards[source, start:stop + 2], boards[1 - source, start + 1:stop + 1, 1:-1],
+                     _pair_table(table))
+
+
+def _release(shm):
+    shm.close()
+    shm.unlink()
+
+
+class TiledEngine(ArrayEngine):
+    """
+    Splits the board into horizontal tiles and steps each one in a
+    process pool worker. Both generations live in one shared memory block,
+    so a worker reads its own rows plus the halo row above and below from
+    the current board and writes its rows of the next one; nothing else is
+    copied between processes. Every generation waits for all tiles, so
+    the result matches ArrayEngine exactly.
+
+    Attributes:
+        workers (int): Number of worker processes, and of tiles.
+    """
+    name = "Tiled"
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._shm = None
+        self._finalizer = None
+        super().__init__()
+
+    def _allocate(self, width, height):
+        self._release_memory()
+        self.width = width
+        self.height = height
+        size = max(1, 2 * (height + 2) * (width + 2))
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._boards = np.ndarray((2, height + 2, width + 2), dtype=np.uint8, buffer=self._shm.buf)
+        self._boards.fill(0)
+        self._current = 0
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+
+        rows = max(1, -(-height // self.workers))
+        self._tiles = [(start, min(start + rows, height)) for start in range(0, height, rows)]
+
+    def _release_memory(self):
+        if self._finalizer is not None:
+            self._boards = None
+            self._finalizer()
+            self._finalizer = None
+        self._shm = None
+
+    @property
+    def board(self):
+        """The visible part of the current board, without the dead border."""
+        return self._boards[self._current, 1:-1, 1:-1]
+
+    def clear(self):
+        self._boards.fill(0)
+
+    def step(self, generations=1):
+        if not self._tiles:
+            return
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        for _ in range(generations):
+            futures = [self._pool.submit(_step_tile, self._shm.name, self.width, self.height,
+                                         self._current, start, stop, self.rule.table)
+                       for start, stop in self._tiles]
+            wait(futures)
+            for future in futures:
+                future.result()
+            self._current = 1 - self._current
+
+    def flips(self):
+        return np.nonzero(self.board != self._boards[1 - self._current, 1:-1, 1:-1])
+
+    def close(self):
+        self._release_memory()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+ENGINES = {
+    SparseEngine.name: SparseEngine,
+    UnboundedEngine.name: UnboundedEngine,
+    ArrayEngine.name: ArrayEngine,
+    TiledEngine.name: TiledEngine,
+}
+
+
+def available_engines():
+    """
+    Lists the names of the engines that can run here.
+
+    Returns:
+        list: Engine names in selector order.
+    """
+    return [name for name, engine in ENGINES.items() if engine.available()]
+
+
+def default_engine():
+    """
+    Picks the fastest engine that is available.
+
+    Returns:
+        str: The name of the engine.
+    """
+    names = available_engines()
+    return ArrayEngine.name if ArrayEngine.name in names else SparseEngine.name
+
+
+def create_engine(name):
+    """
+    Builds an engine from its selector name.
+
+    Args:
+        name (str): One of the names in ENGINES.
+
+    Returns:
+        Engine: A new, empty engine.
+
+    Raises:
+        ValueError: If the engine is unknown or cannot run here.
+    """
+    engine = ENGINES.get(name)
+    if engine is None or not engine.available():
+        raise ValueError(f"Engine '{name}' is not available")
+    return engine()
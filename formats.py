@@ -0,0 +1,305 @@
+"""
+Readers and writers for saved board states.
+
+All formats read into and write from the same state dict the Save button
+has always produced: cell_size, grid (a list of [row, col]), width and
+height, plus the rulestring under rule. Cells of an unbounded universe
+may lie outside width x height, which is then only its home area. The
+format is picked from the file extension when saving and detected from
+the file contents when loading, so old JSON saves keep loading.
+
+Formats:
+    json: The original list of live cell coordinates.
+    binary: A small header and the board bit-packed row by row, then
+        zlib-compressed, so empty stretches cost next to nothing. If
+        cells lie outside the board, a zlib-compressed list of them
+        instead, so far flung cells do not need a bitmap of the space
+        between them.
+    rle: The standard Life RLE format used by other Life programs.
+"""
+import json
+import re
+import struct
+import zlib
+from rules import DEFAULT_RULE, Rule, parse_rule
+
+# Binary header: magic, version, cell_size, width, height. Version 2 adds
+# the rule as birth and survival bit masks; version 1 files are Conway's.
+# Version 3 is version 2 with a list of row, col pairs instead of the
+# bitmap, only written when cells lie outside the board.
+MAGIC = b"GOLB"
+VERSION = 2
+CELL_LIST_VERSION = 3
+HEADER = struct.Struct("<4sBHII")
+RULE = struct.Struct("<HH")
+CELL = struct.Struct("<ii")
+
+# File extensions and the format each one saves as.
+EXTENSIONS = {".json": "json", ".gol": "binary", ".rle": "rle"}
+
+# Filetypes for the Save/Load dialogs.
+FILETYPES = [("JSON files", "*.json"), ("Compact binary", "*.gol"), ("Life RLE", "*.rle"),
+             ("All files", "*.*")]
+
+# Longest line the RLE writer produces, as the format recommends.
+RLE_LINE_LENGTH = 70
+
+_NONZERO = re.compile(rb"[^\x00]")
+_RLE_HEADER = re.compile(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?", re.IGNORECASE)
+_RLE_TOKEN = re.compile(r"(\d*)([a-zA-Z$!])")
+_RLE_POSITION = re.compile(r"#CXRLE.*\bPos\s*=\s*(-?\d+)\s*,\s*(-?\d+)")
+# Column offsets of the set bits in every possible byte, most significant first.
+_BITS = [tuple(bit for bit in range(8) if byte & (0x80 >> bit)) for byte in range(256)]
+
+
+def format_for_path(file_path):
+    """
+    Returns:
+        str: The format a path saves as, by extension; JSON if unknown.
+    """
+    for extension, fmt in EXTENSIONS.items():
+        if file_path.lower().endswith(extension):
+            return fmt
+    return "json"
+
+
+def detect_format(data):
+    """
+    Works out the format of a state file from its first bytes.
+
+    Args:
+        data (bytes): The file contents.
+
+    Returns:
+        str: "binary", "json" or "rle".
+
+    Raises:
+        ValueError: If the contents match no known format.
+    """
+    if data.startswith(MAGIC):
+        return "binary"
+    text = data.lstrip()
+    if text.startswith(b"{"):
+        return "json"
+    if text.startswith(b"#") or re.match(rb"x\s*=", text):
+        return "rle"
+    raise ValueError("Unrecognised state file")
+
+
+def encode_binary(state):
+    width = state["width"]
+    height = state["height"]
+    rule = RULE.pack(*parse_rule(state.get("rule") or DEFAULT_RULE).masks)
+    if not _on_board(state):
+        header = HEADER.pack(MAGIC, CELL_LIST_VERSION, state["cell_size"], width, height)
+        cells = b"".join(CELL.pack(row, col) for row, col in state["grid"])
+        return header + rule + zlib.compress(cells)
+    row_bytes = (width + 7) // 8
+    bits = bytearray(row_bytes * height)
+    for row, col in state["grid"]:
+        bits[row * row_bytes + (col >> 3)] |= 0x80 >> (col & 7)
+    header = HEADER.pack(MAGIC, VERSION, state["cell_size"], width, height)
+    return header + rule + zlib.compress(bytes(bits))
+
+
+def _on_board(state):
+    width = state["width"]
+    height = state["height"]
+    return all(0 <= row < height and 0 <= col < width for row, col in state["grid"])
+
+
+def decode_binary(data):
+    magic, version, cell_size, width, height = HEADER.unpack_from(data)
+    if version == 1:
+        rule = DEFAULT_RULE
+        offset = HEADER.size
+    elif version in (VERSION, CELL_LIST_VERSION):
+        rule = Rule.from_masks(*RULE.unpack_from(data, HEADER.size)).string
+        offset = HEADER.size + RULE.size
+    else:
+        raise ValueError(f"Unsupported binary state version {version}")
+    if version == CELL_LIST_VERSION:
+        grid = [list(cell) for cell in CELL.iter_unpack(zlib.decompress(data[offset:]))]
+        return {"cell_size": cell_size, "grid": grid, "width": width, "height": height, "rule": rule}
+    bits = zlib.decompress(data[offset:])
+    row_bytes = (width + 7) // 8
+    grid = []
+    # Jump straight to the bytes with live cells in them.
+    for match in _NONZERO.finditer(bits):
+        index = match.start()
+        row, byte = divmod(index, row_bytes)
+        base = byte * 8
+        for bit in _BITS[bits[index]]:
+            grid.append([row, base + bit])
+    return {"cell_size": cell_size, "grid": grid, "width": width, "height": height, "rule": rule}
+
+
+def encode_rle(state):
+    """
+    Writes a state as Life RLE. x and y are the whole board, so the cells
+    keep their positions when the file is loaded back. Cells above or left
+    of the board move the pattern's corner there, which a "#CXRLE Pos"
+    line gives, as Golly writes it, and a "#C board" comment then keeps
+    the board size.
+    """
+    width = state["width"]
+    height = state["height"]
+    top = min(0, min((row for row, _ in state["grid"]), default=0))
+    left = min(0, min((col for _, col in state["grid"]), default=0))
+    rows = {}
+    for row, col in state["grid"]:
+        rows.setdefault(row - top, []).append(col - left)
+    on_board = _on_board(state)
+
+    tokens = []
+    last_row = 0
+    for row in sorted(rows):
+        if row > last_row:
+            tokens.append(_rle_run(row - last_row, "$"))
+        last_row = row
+        col = 0
+        cols = sorted(rows[row])
+        i = 0
+        while i < len(cols):
+            start = cols[i]
+            while i + 1 < len(cols) and cols[i + 1] == cols[i] + 1:
+                i += 1
+            if start > col:
+                tokens.append(_rle_run(start - col, "b"))
+            tokens.append(_rle_run(cols[i] - start + 1, "o"))
+            col = cols[i] + 1
+            i += 1
+    tokens.append("!")
+
+    lines = [f"#N {state['name']}"] if state.get("name") else []
+    lines.append(f"#C cell_size {state['cell_size']}")
+    if not on_board:
+        lines.append(f"#C board {width} {height}")
+        if top or left:
+            lines.append(f"#CXRLE Pos={left},{top}")
+        width = max(width, max(max(cols) + 1 for cols in rows.values()) + left)
+        height = max(height, max(rows) + 1 + top)
+    lines.append(f"x = {width - left}, y = {height - top}, rule = {state.get('rule') or DEFAULT_RULE}")
+    line = ""
+    for token in tokens:
+        if len(line) + len(token) > RLE_LINE_LENGTH:
+            lines.append(line)
+            line = ""
+        line += token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def _rle_run(count, tag):
+    return f"{count}{tag}" if count > 1 else tag
+
+
+def decode_rle(text):
+    """
+    Reads Life RLE. Cells are placed relative to the top-left corner of
+    the pattern, or to a "#CXRLE Pos" line's position, and the board is
+    sized to x by y. A "#C cell_size N" comment, as written by encode_rle,
+    restores the cell size and a "#C board W H" one the board size, and a
+    "#N" line gives the pattern's name. A rule other programs use that is
+    not Life-like, e.g. a multi-state one, is left out.
+    """
+    state = {"grid": [], "width": 0, "height": 0}
+    body = []
+    top = left = 0
+    board = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#"):
+            match = re.match(r"#C\s+cell_size\s+(\d+)", line)
+            position = _RLE_POSITION.match(line)
+            board_size = re.match(r"#C\s+board\s+(\d+)\s+(\d+)", line)
+            if match:
+                state["cell_size"] = int(match.group(1))
+            elif position:
+                left, top = int(position.group(1)), int(position.group(2))
+            elif board_size:
+                board = (int(board_size.group(1)), int(board_size.group(2)))
+            elif line.startswith("#N"):
+                state["name"] = line[2:].strip()
+            continue
+        header = _RLE_HEADER.match(line)
+        if header and not body:
+            state["width"] = int(header.group(1))
+            state["height"] = int(header.group(2))
+            if header.group(3):
+                try:
+                    state["rule"] = parse_rule(header.group(3)).string
+                except ValueError:
+                    pass
+            continue
+        body.append(line)
+
+    row = top
+    col = left
+    for count, tag in _RLE_TOKEN.findall("".join(body)):
+        count = int(count) if count else 1
+        if tag == "!":
+            break
+        if tag == "$":
+            row += count
+            col = left
+        elif tag == "b":
+            col += count
+        else:
+            # "o", and any other letter from multi-state files, is alive.
+            state["grid"].extend([row, col + i] for i in range(count))
+            col += count
+
+    if board is not None:
+        # Cells off the board are an unbounded universe's.
+        state["width"], state["height"] = board
+        return state
+    width = max((c for _, c in state["grid"]), default=-1) + 1
+    height = max((r for r, _ in state["grid"]), default=-1) + 1
+    state["width"] = max(state["width"], width)
+    state["height"] = max(state["height"], height)
+    return state
+
+
+def save(state, file_path, fmt=None):
+    """
+    Writes a state to a file.
+
+    Args:
+        state (dict): The state to write.
+        file_path (str): Where to write it.
+        fmt (str, optional): "json", "binary" or "rle"; by default picked
+            from the file extension.
+    """
+    fmt = fmt or format_for_path(file_path)
+    if fmt == "binary":
+        with open(file_path, "wb") as f:
+            f.write(encode_binary(state))
+    elif fmt == "rle":
+        with open(file_path, "w") as f:
+            f.write(encode_rle(state))
+    else:
+        with open(file_path, "w") as f:
+            json.dump(state, f)
+
+
+def load(file_path):
+    """
+    Reads a state from a file in any of the supported formats.
+
+    Args:
+        file_path (str): The file to read.
+
+    Returns:
+        dict: The state. RLE files without a cell size have no cell_size.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    fmt = detect_format(data)
+    if fmt == "binary":
+        return decode_binary(data)
+    if fmt == "rle":
+        return decode_rle(data.decode("utf-8"))
+    return json.loads(data)
@@ -1,22 +1,66 @@
-import json
+import time
 import tkinter as tk
-from tkinter import Label, Button, Canvas, Frame, Scale, filedialog
-import pygame
-from pygame import mixer
-from utils import resource_path
-import random
+from tkinter import Label, Button, Canvas, Checkbutton, Frame, Scale, OptionMenu, Spinbox, BooleanVar, IntVar, StringVar, filedialog
+import formats
+import recorder
+from engines import available_engines, default_engine
+from history import History
+from metrics import FrameMetrics
+from renderers import CanvasRenderer, GridLayer, ImageRenderer
+from producer import FrameProducer
+from scheduler import FrameScheduler
+from patterns import default_library
+from rules import RULES, rule_name
+from simulation import Simulation
+
+# In "Auto" render mode, boards with more live cells or more cells overall
+# than these are drawn as one bitmap instead of one canvas item per cell.
+BITMAP_MIN_POPULATION = 3000
+BITMAP_MIN_BOARD = 40000
+
+# The Speed scale is logarithmic: position p runs 10 ** (p / 10) generations
+# per second, so 0-40 covers 1 to 10000.
+SPEED_SCALE_MAX = 40
+# Redraws per second while playing, however fast the simulation runs.
+MAX_FPS = 60
+# Shortest gap between two paint sounds while dragging, in seconds.
+PAINT_SOUND_INTERVAL = 0.08
+# Cell size change per mouse wheel notch, and its limits (the Grid Size scale's).
+ZOOM_STEP = 1.25
+MIN_CELL_SIZE = 5
+MAX_CELL_SIZE = 50
+# Seconds between refreshes of the stats overlay.
+OVERLAY_INTERVAL = 0.25
+# Largest k for Jump 2^k. The whole result is loaded back into the engine,
+# and a growing pattern gets too big to list well before HashLife slows.
+JUMP_MAX_POWER = 20
+# Memory the undo history may use, in bytes; the oldest changes go first.
+HISTORY_BYTES = 64 << 20
+
+
+def speed_from_scale(position):
+    return round(10 ** (float(position) / 10), 1)
+
 
 class GameOfLife:
     """
     A class to represent Conway's Game of Life using Tkinter for the GUI and 
-    Pygame for audio. It provides controls for starting, pausing, and stepping through the simulation using next/speed, as well as 
-    functionalities for drawing on the grid and saving/loading grid states.
+    Pygame for audio. The board itself lives in a headless Simulation (see
+    simulation.py). It provides controls for starting, pausing, and stepping
+    through the simulation using next/speed, as well as functionalities for
+    drawing on the grid and saving/loading grid states.
 
     Attributes:
         master (tk.Tk): The root window for the Tkinter application.
+        sim (Simulation): The headless board being displayed.
+        view (tuple): Universe (row, col) shown in the top-left corner of the canvas.
+        patterns (PatternLibrary): The pattern files a start pattern is picked from.
         color_palette (dict): A dictionary containing colors for different UI components (e.g., primary, secondary, accent).
         muted (tk.BooleanVar): A variable indicating whether the sound is muted.
-        bgm (pygame.mixer.Sound): The background music sound object.
+        sounds (SoundBank): The music and sound effects, loaded in the background.
+        on_ready (callable): Called once the first board has been drawn.
+        metrics (FrameMetrics): Per-frame timings for the stats overlay and any hooks added to it.
+        history (History): Recent changes to the board, for Undo and Previous Frame.
 
     Methods:
         update_sound_volume():
@@ -31,20 +75,47 @@ class GameOfLife:
         on_resize(event):
             Handles the window resizing event, adjusts the grid size, and redraws the grid.
         
+        apply_layout(layout):
+            Rebuilds the cached grid lines for a new board size or cell size.
+        
         draw_grid():
-            Draws the grid lines and existing cells on the canvas.
+            Brings the canvas up to date, only touching the cells that changed.
         
         draw_cell(row, col):
-            Draws a single cell on the canvas at the specified row and column.
+            Shows a single cell on the canvas at the specified row and column.
+        
+        draw_cells(cells):
+            Shows a batch of newly painted cells without redrawing the rest of the board.
+        
+        visible_cells():
+            Lists the live cells inside the viewport, in canvas cell coordinates.
+        
+        cell_at(event):
+            Converts a mouse position to a universe cell.
+        
+        set_view(top, left):
+            Pans the viewport over an unbounded universe.
+        
+        start_pan(event), pan(event):
+            Drag the viewport around with the right or middle mouse button.
+        
+        zoom(event):
+            Changes the cell size with the mouse wheel, keeping the cell under the pointer in place.
+        
+        pick_renderer():
+            Chooses between per-cell canvas items and a single bitmap for the next frame.
         
         start_selection(event):
             Starts a selection process for drawing cells on the grid when the user clicks the canvas.
         
         update_selection(event):
-            Updates the selection, filling cells between the previous and current mouse positions.
+            Updates the selection, queueing the cells between the previous and current mouse positions.
         
         fill_cells_between(start, end):
-            Fills cells along a line between two points,used for dragging the mouse to draw on the grid.
+            Queues the cells along a line between two points, used for dragging the mouse to draw on the grid.
+        
+        flush_paint():
+            Applies the queued cells to the board once per display frame.
         
         end_selection(event):
             Ends the selection process for drawing cells on the grid.
@@ -61,6 +132,24 @@ class GameOfLife:
         load_state():
             Opens a file dialog to load a grid state from a JSON file.
         
+        toggle_recording():
+            Starts or stops streaming every generation to a recording file.
+        
+        record_frame(changed):
+            Queues the current board, or the cells the last step flipped, for the recording, if one is running.
+        
+        show_dropped_frames():
+            Shows on the record button how many frames the recording dropped.
+        
+        on_close():
+            Stops play, finishes the recording and closes the window.
+        
+        toggle_replay():
+            Opens a recording to play back and seek through, or leaves replay mode.
+        
+        seek_replay(val):
+            Shows the recorded frame picked on the seek scale.
+        
         update_grid_size(val):
             Updates the size of the grid cells based on the provided value.
         
@@ -68,38 +157,90 @@ class GameOfLife:
             start/stop.
         
         run_game():
-            Continuously updates.
+            Continuously updates, stepping as many generations as are due and redrawing once per tick.
+        
+        record_metrics(generations, lag):
+            Closes the frame's timings into a metrics record and refreshes the overlay.
+        
+        toggle_metrics():
+            Shows or hides the stats overlay.
+        
+        board_edited(stepped):
+            Called after anything but the play loop changes the board, so precomputed frames are dropped
+            and the change goes into the undo history.
+        
+        toggle_precompute():
+            Switches between stepping on the Tk thread and a background worker filling a frame queue.
         
         next_frame():
             Advances the simulation to the next frame.
+
+        previous_frame():
+            Goes back a generation, taking back any edits made since.
+
+        undo():
+            Takes back the last change to the board, an edit or a step.
+
+        board_restored():
+            Brings the controls and the canvas up to date after going back in the history.
         
-        count_neighbors(row, col):
-            Counts the number of alive neighbors for a given cell according to the rules.
+        jump_frames():
+            Jumps the simulation 2^k generations ahead using the HashLife engine.
+
+        update_jump_controls():
+            Only offers Jump on an unbounded universe, the one HashLife gives the same result on.
+        
+        set_engine(name):
+            Switches the simulation backend, carrying the current cells over.
+        
+        set_rule(name):
+            Switches to a named Life-like rule or a rulestring.
+        
+        set_cycle_mode(mode):
+            Chooses what happens once the board settles into a cycle: nothing, report it, pause or loop it.
         
         clear_grid():
             Wipe the grid.
         
         update_speed(val):
-            Custom speed.
+            Custom speed, in generations per second on a logarithmic scale.
     """
-    def __init__(self, master, color_palette, muted, bgm):
+    def __init__(self, master, color_palette, muted, sounds, on_ready=None):
         self.master = master
         self.color_palette = color_palette
-        self.cell_size = 20
+        self.sim = Simulation(cell_size=20, engine=default_engine())
+        self.view = (0, 0)
+        self.pan_anchor = None
+        self.patterns = default_library()
         self.cell_padding = 1
         self.is_running = False
         self.speed = 1
+        self.scheduler = FrameScheduler(target_gps=self.speed, max_fps=MAX_FPS)
+        self.after_id = None
+        # When the next run_game tick was asked for, to see how late Tk runs it.
+        self.tick_due = None
+        self.metrics = FrameMetrics()
+        self.history = History(HISTORY_BYTES)
+        self.overlay_drawn = 0
+        self.producer = None
+        self.recording = None
+        # Dropped frames the record button shows.
+        self.shown_dropped = 0
+        self.replay = None
+        self.paused_cycle = None
         self.is_selecting = False
         self.last_cell = None
+        # Cells dragged over since the last paint flush.
+        self.pending_cells = set()
+        self.paint_after = None
+        self.last_paint_sound = 0
 
         self.save_button = None
         self.load_button = None
 
-        # pygame for audio :D
-        pygame.mixer.init()
-        self.click_sound = mixer.Sound(resource_path("assets/music/s2.wav"))
-        self.remove_sound = mixer.Sound(resource_path("assets/music/s1.wav"))
-        self.bgm = bgm
+        # pygame for audio :D, shared with the menu (see sounds.py)
+        self.sounds = sounds
+        self.on_ready = on_ready
         self.is_muted = muted.get()
         self.update_sound_volume()
 
@@ -108,83 +249,192 @@ class GameOfLife:
 
         self.canvas = tk.Canvas(self.frame, highlightthickness=0, bg=self.color_palette["primary"])
         self.canvas.pack(fill="both", expand=True)
-
-        self.grid = {}
-        self.width = 0
-        self.height = 0
+        self.layout = None
+        self.grid_layer = GridLayer(self.canvas, self.color_palette)
+        self.renderers = {"Shapes": CanvasRenderer(self.canvas, self.color_palette, self.grid_layer)}
+        if ImageRenderer.available():
+            self.renderers["Bitmap"] = ImageRenderer(self.canvas, self.color_palette, self.grid_layer)
+        self.renderer = self.renderers["Shapes"]
 
         self.create_control_panel()
+        self.set_cycle_mode(self.cycle_mode.get())
         
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
         self.master.bind("<Configure>", self.on_resize)
         self.canvas.bind("<Button-1>", self.start_selection)
         self.canvas.bind("<B1-Motion>", self.update_selection)
         self.canvas.bind("<ButtonRelease-1>", self.end_selection)
+        for button in (2, 3):
+            self.canvas.bind(f"<Button-{button}>", self.start_pan)
+            self.canvas.bind(f"<B{button}-Motion>", self.pan)
+        self.canvas.bind("<MouseWheel>", self.zoom)
+        self.canvas.bind("<Button-4>", self.zoom)
+        self.canvas.bind("<Button-5>", self.zoom)
+        self.canvas.bind("<Left>", lambda _: self.pan_by(0, -1))
+        self.canvas.bind("<Right>", lambda _: self.pan_by(0, 1))
+        self.canvas.bind("<Up>", lambda _: self.pan_by(-1, 0))
+        self.canvas.bind("<Down>", lambda _: self.pan_by(1, 0))
+        self.canvas.bind("<Home>", lambda _: self.set_view(0, 0))
+        self.master.bind("<Control-z>", lambda _: self.undo())
 
         self.master.after(100, self.initialize_grid)
 
     def update_sound_volume(self):
         volume = 0 if self.is_muted else 1
-        self.click_sound.set_volume(volume)
-        self.remove_sound.set_volume(volume)
+        self.sounds.set_effects_volume(volume)
 
     def mute(self):
         self.is_muted = not self.is_muted
         volume = 0 if self.is_muted else 1
-        self.click_sound.set_volume(volume)
-        self.remove_sound.set_volume(volume)
-        self.bgm.set_volume(volume)
+        self.sounds.set_effects_volume(volume)
+        self.sounds.set_music_volume(volume)
 
     def initialize_grid(self):
         self.on_resize(None)
         self.clear_grid()
-        patterns = ["Gosper Glider Gun", "Pulse", "Cooper Head", "Infinite"]
-        chosen_pattern = random.choice(patterns)
-        self.create_pattern(chosen_pattern)
+        # Only the library index is read here; the pattern file is parsed on pick.
+        chosen_pattern = self.patterns.random_name()
+        if chosen_pattern:
+            self.create_pattern(chosen_pattern)
         self.draw_grid()
+        if self.on_ready is not None:
+            self.on_ready()
 
     def on_resize(self, event):
+        # <Configure> fires for every widget in the window, so only touch the
+        # board and the grid lines when the layout really changed.
         canvas_width = self.canvas.winfo_width()
         canvas_height = self.canvas.winfo_height()
         
         if canvas_width > 1 and canvas_height > 1:
-            self.width = canvas_width // self.cell_size
-            self.height = canvas_height // self.cell_size
-            self.draw_grid()
+            width = canvas_width // self.sim.cell_size
+            height = canvas_height // self.sim.cell_size
+            if (width, height) != (self.sim.width, self.sim.height):
+                self.sim.resize(width, height)
+                self.board_edited()
+            layout = (width, height, self.sim.cell_size, self.cell_padding)
+            if layout != self.layout:
+                self.apply_layout(layout)
+                self.draw_grid()
+
+    def apply_layout(self, layout):
+        self.layout = layout
+        width, height, cell_size, _ = layout
+        self.grid_layer.build(width, height, cell_size)
+        for renderer in self.renderers.values():
+            renderer.invalidate()
 
     def draw_grid(self):
-        self.canvas.delete("all")
-        self.canvas.create_rectangle(0, 0, self.width * self.cell_size, self.height * self.cell_size, 
-                                     fill=self.color_palette["primary"], width=0)
-        
-        # Draw all cells first
-        for (row, col) in self.grid:
-            self.draw_cell(row, col)
-        
-        # Draw grid lines on top
-        for i in range(0, self.width * self.cell_size + 1, self.cell_size):
-            self.canvas.create_line(i, 0, i, self.height * self.cell_size, fill=self.color_palette["accent"])
-        for i in range(0, self.height * self.cell_size + 1, self.cell_size):
-            self.canvas.create_line(0, i, self.width * self.cell_size, i, fill=self.color_palette["accent"])
+        if self.layout is None:
+            return
+        # The grid lines are cached per layout; renderers only update cells.
+        with self.metrics.measure("render"):
+            self.pick_renderer()
+            self.renderer.set_geometry(*self.layout)
+            self.renderer.render(self.visible_cells())
+        if self.metrics.overlay:
+            self.canvas.tag_raise("metrics")
+
+    def visible_cells(self):
+        # Only the part of the universe under the canvas is looked at, so
+        # drawing costs the same however far the pattern has spread.
+        top, left = self.view
+        width, height = self.layout[:2]
+        cells = self.sim.cells_in(top, left, height, width)
+        if top or left:
+            cells = [(row - top, col - left) for row, col in cells]
+        return cells
 
     def draw_cell(self, row, col):
-        x1 = col * self.cell_size + self.cell_padding
-        y1 = row * self.cell_size + self.cell_padding
-        x2 = (col + 1) * self.cell_size - self.cell_padding
-        y2 = (row + 1) * self.cell_size - self.cell_padding
-        self.canvas.create_rectangle(x1, y1, x2, y2, fill=self.color_palette["secondary"], width=0)
+        self.draw_cells([(row, col)])
+
+    def draw_cells(self, cells):
+        if self.layout is None:
+            return
+        top, left = self.view
+        width, height = self.layout[:2]
+        cells = [(row - top, col - left) for row, col in cells
+                 if 0 <= row - top < height and 0 <= col - left < width]
+        self.renderer.set_geometry(*self.layout)
+        self.renderer.show_cells(cells)
+
+    def cell_at(self, event):
+        top, left = self.view
+        return (event.y // self.sim.cell_size + top, event.x // self.sim.cell_size + left)
+
+    def set_view(self, top, left):
+        # A bounded board always fills the canvas from its corner.
+        view = (top, left) if not self.sim.bounded else (0, 0)
+        if view != self.view:
+            self.view = view
+            self.draw_grid()
+
+    def pan_by(self, rows, cols):
+        """Pans by a quarter of the canvas per arrow key press."""
+        if self.layout is None:
+            return
+        width, height = self.layout[:2]
+        self.set_view(self.view[0] + rows * max(1, height // 4), self.view[1] + cols * max(1, width // 4))
+
+    def start_pan(self, event):
+        self.canvas.focus_set()
+        self.pan_anchor = (event.x, event.y, self.view)
+
+    def pan(self, event):
+        if self.pan_anchor is None:
+            return
+        x, y, (top, left) = self.pan_anchor
+        cell_size = self.sim.cell_size
+        self.set_view(top - (event.y - y) // cell_size, left - (event.x - x) // cell_size)
+
+    def zoom(self, event):
+        zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        cell_size = self.sim.cell_size
+        if zoom_in:
+            new_cell_size = min(MAX_CELL_SIZE, max(cell_size + 1, round(cell_size * ZOOM_STEP)))
+        else:
+            new_cell_size = max(MIN_CELL_SIZE, min(cell_size - 1, round(cell_size / ZOOM_STEP)))
+        if new_cell_size == cell_size:
+            return
+        # Keep the cell under the pointer where it is.
+        row, col = self.cell_at(event)
+        if not self.sim.bounded:
+            self.view = (row - event.y // new_cell_size, col - event.x // new_cell_size)
+        self.grid_size_scale.set(new_cell_size)
+        self.update_grid_size(new_cell_size)
+
+    def pick_renderer(self):
+        mode = self.render_mode.get()
+        if mode == "Auto":
+            threshold = BITMAP_MIN_POPULATION
+            if self.renderer is self.renderers.get("Bitmap"):
+                # Only drop back once well below the threshold, so a board
+                # hovering around it does not rebuild the canvas every frame.
+                threshold //= 2
+            big = (self.sim.population() > threshold or
+                   self.sim.width * self.sim.height > BITMAP_MIN_BOARD)
+            mode = "Bitmap" if big else "Shapes"
+        renderer = self.renderers.get(mode, self.renderers["Shapes"])
+        if renderer is not self.renderer:
+            self.renderer.detach()
+            renderer.invalidate()
+            self.renderer = renderer
 
     def start_selection(self, event):
         self.is_selecting = True
-        self.last_cell = (event.y // self.cell_size, event.x // self.cell_size)
+        self.canvas.focus_set()
+        self.last_cell = self.cell_at(event)
         self.toggle_cell(event)
 
     def update_selection(self, event):
         if self.is_selecting:
-            current_cell = (event.y // self.cell_size, event.x // self.cell_size)
+            current_cell = self.cell_at(event)
             if current_cell != self.last_cell:
                 self.fill_cells_between(self.last_cell, current_cell)
                 self.last_cell = current_cell
-                self.click_sound.play()
+                # Motion events come much faster than frames; paint once per frame.
+                if self.paint_after is None:
+                    self.paint_after = self.master.after(1000 // MAX_FPS, self.flush_paint)
 
     def fill_cells_between(self, start, end):
         x0, y0 = start
@@ -196,9 +446,8 @@ class GameOfLife:
         err = dx - dy
 
         while True:
-            if 0 <= x0 < self.height and 0 <= y0 < self.width:
-                self.grid[(x0, y0)] = 1
-                self.draw_cell(x0, y0)
+            if self.sim.in_bounds(x0, y0):
+                self.pending_cells.add((x0, y0))
             if x0 == x1 and y0 == y1:
                 break
             e2 = 2 * err
@@ -208,22 +457,41 @@ class GameOfLife:
             if e2 < dx:
                 err += dx
                 y0 += sy
-        self.draw_grid()  # Redraw the entire grid to ensure grid lines are on top
+
+    def flush_paint(self):
+        self.paint_after = None
+        born = [cell for cell in self.pending_cells if not self.sim.is_alive(*cell)]
+        self.pending_cells.clear()
+        if not born:
+            return
+        for row, col in born:
+            self.sim.set_cell(row, col, True)
+        # Only the new cells are drawn; the rest of the board is untouched.
+        self.draw_cells(born)
+        self.board_edited()
+        now = time.perf_counter()
+        if now - self.last_paint_sound >= PAINT_SOUND_INTERVAL:
+            self.last_paint_sound = now
+            self.sounds.play("click")
 
     def end_selection(self, event):
         self.is_selecting = False
+        if self.paint_after is not None:
+            self.master.after_cancel(self.paint_after)
+            self.flush_paint()
+        # A whole stroke is one undo step.
+        self.history.push(self.sim)
 
     def toggle_cell(self, event):
-        col = event.x // self.cell_size
-        row = event.y // self.cell_size
-        if 0 <= row < self.height and 0 <= col < self.width:
-            if (row, col) in self.grid:
-                del self.grid[(row, col)]
-                self.remove_sound.play()
+        row, col = self.cell_at(event)
+        if self.sim.in_bounds(row, col):
+            if self.sim.is_alive(row, col):
+                self.sim.set_cell(row, col, False)
+                self.sounds.play("remove")
             else:
-                self.grid[(row, col)] = 1
-                self.draw_cell(row, col)
-                self.click_sound.play()
+                self.sim.set_cell(row, col, True)
+                self.sounds.play("click")
+            self.board_edited()
             self.draw_grid()
 
     def create_control_panel(self):
@@ -238,11 +506,41 @@ class GameOfLife:
         self.play_pause_button = Button(self.control_panel, text="Play", command=self.toggle_play_pause, **button_style)
         self.play_pause_button.pack(side='left', padx=5, pady=5)
 
+        self.precompute = BooleanVar(value=False)
+        self.precompute_check = Checkbutton(self.control_panel, text="Precompute", variable=self.precompute,
+                                            command=self.toggle_precompute, bg=self.color_palette["primary"],
+                                            fg=self.color_palette["accent"], selectcolor=self.color_palette["primary"],
+                                            activebackground=self.color_palette["primary"],
+                                            activeforeground=self.color_palette["secondary"])
+        self.precompute_check.pack(side='left', padx=5, pady=5)
+
+        self.show_metrics = BooleanVar(value=False)
+        self.metrics_check = Checkbutton(self.control_panel, text="Stats", variable=self.show_metrics,
+                                         command=self.toggle_metrics, bg=self.color_palette["primary"],
+                                         fg=self.color_palette["accent"], selectcolor=self.color_palette["primary"],
+                                         activebackground=self.color_palette["primary"],
+                                         activeforeground=self.color_palette["secondary"])
+        self.metrics_check.pack(side='left', padx=5, pady=5)
+
+        self.previous_frame_button = Button(self.control_panel, text="Previous Frame", command=self.previous_frame,
+                                            **button_style)
+        self.previous_frame_button.pack(side='left', padx=5, pady=5)
+
         self.next_frame_button = Button(self.control_panel, text="Next Frame", command=self.next_frame, **button_style)
         self.next_frame_button.pack(side='left', padx=5, pady=5)
 
+        self.jump_button = Button(self.control_panel, text="Jump 2^k", command=self.jump_frames, **button_style)
+        self.jump_button.pack(side='left', padx=5, pady=5)
+        self.jump_power = IntVar(value=10)
+        self.jump_spinbox = Spinbox(self.control_panel, from_=0, to=JUMP_MAX_POWER, width=3,
+                                    textvariable=self.jump_power)
+        self.jump_spinbox.pack(side='left', padx=(0, 5), pady=5)
+        self.update_jump_controls()
+
         self.clear_button = Button(self.control_panel, text="Clear", command=self.clear_grid, **button_style)
         self.clear_button.pack(side='left', padx=5, pady=5)
+        self.undo_button = Button(self.control_panel, text="Undo", command=self.undo, **button_style)
+        self.undo_button.pack(side='left', padx=5, pady=5)
 
         # Add Save and Load buttons
         self.save_button = Button(self.control_panel, text="Save", command=self.save_state, **button_style)
@@ -250,6 +548,11 @@ class GameOfLife:
         self.load_button = Button(self.control_panel, text="Load", command=self.load_state, **button_style)
         self.load_button.pack(side='left', padx=5, pady=5)
 
+        self.record_button = Button(self.control_panel, text="Record", command=self.toggle_recording, **button_style)
+        self.record_button.pack(side='left', padx=5, pady=5)
+        self.replay_button = Button(self.control_panel, text="Replay", command=self.toggle_replay, **button_style)
+        self.replay_button.pack(side='left', padx=5, pady=5)
+
         # Add the randomize button
         self.randomize_button = Button(self.control_panel, text="Randomize", command=self.randomize_grid, **button_style)
         self.randomize_button.pack(side='left', padx=5, pady=5)
@@ -259,140 +562,406 @@ class GameOfLife:
         self.pattern_label = Label(self.control_panel, text="Pattern: None", bg=self.color_palette["primary"], fg=self.color_palette["accent"])
         self.pattern_label.pack(side='left', padx=5, pady=5)
 
-        self.speed_scale = Scale(self.control_panel, from_=1, to=10, orient='horizontal', label='Speed',
-                                 command=self.update_speed, **scale_style)
-        self.speed_scale.set(5)
+        self.render_mode = StringVar(value="Auto")
+        self.render_menu = OptionMenu(self.control_panel, self.render_mode, "Auto", "Auto", *self.renderers,
+                                      command=lambda _: self.draw_grid())
+        self.render_menu.config(highlightthickness=0, **button_style)
+        self.render_menu.pack(side='right', padx=5, pady=5)
+
+        self.engine_name = StringVar(value=self.sim.engine.name)
+        self.engine_menu = OptionMenu(self.control_panel, self.engine_name, self.sim.engine.name,
+                                      *available_engines(), command=self.set_engine)
+        self.engine_menu.config(highlightthickness=0, **button_style)
+        self.engine_menu.pack(side='right', padx=5, pady=5)
+
+        self.rule_choice = StringVar(value=rule_name(self.sim.rule))
+        self.rule_menu = OptionMenu(self.control_panel, self.rule_choice, self.rule_choice.get(), *RULES,
+                                    command=self.set_rule)
+        self.rule_menu.config(highlightthickness=0, **button_style)
+        self.rule_menu.pack(side='right', padx=5, pady=5)
+
+        self.cycle_mode = StringVar(value="Report")
+        self.cycle_menu = OptionMenu(self.control_panel, self.cycle_mode, "Report", "Off", "Report", "Pause", "Loop",
+                                     command=self.set_cycle_mode)
+        self.cycle_menu.config(highlightthickness=0, **button_style)
+        self.cycle_menu.pack(side='right', padx=5, pady=5)
+
+        self.rate_label = Label(self.control_panel, text="", bg=self.color_palette["primary"], fg=self.color_palette["accent"])
+        self.rate_label.pack(side='right', padx=5, pady=5)
+        self.speed_scale = Scale(self.control_panel, from_=0, to=SPEED_SCALE_MAX, orient='horizontal', label='Speed',
+                                 showvalue=0, command=self.update_speed, **scale_style)
+        self.speed_scale.set(7)
         self.speed_scale.pack(side='right', padx=5, pady=5)
 
         self.grid_size_scale = Scale(self.control_panel, from_=5, to=50, orient='horizontal', label='Grid Size',
                                      command=self.update_grid_size, **scale_style)
-        self.grid_size_scale.set(self.cell_size)
+        self.grid_size_scale.set(self.sim.cell_size)
         self.grid_size_scale.pack(side='right', padx=5, pady=5)
 
+        # Only shown in replay mode, above the rest of the controls.
+        self.replay_panel = Frame(self.frame, bg=self.color_palette["primary"])
+        self.seek_scale = Scale(self.replay_panel, from_=0, to=0, orient='horizontal', label='Frame',
+                                command=self.seek_replay, **scale_style)
+        self.seek_scale.pack(side='left', fill='x', expand=True, padx=5, pady=5)
+        self.replay_label = Label(self.replay_panel, text="", bg=self.color_palette["primary"], fg=self.color_palette["accent"])
+        self.replay_label.pack(side='right', padx=5, pady=5)
+
     def randomize_grid(self):
-        self.clear_grid()
-        
-        # Calculate the center of the grid
-        center_row = self.height // 2
-        center_col = self.width // 2
-        
-        # Calculate the maximum size of the random pattern (25-50% of total grid size)
-        max_size = int(min(self.width, self.height) * random.uniform(0.25, 0.5))
-        
-        # Generate random cells within the calculated area
-        for _ in range(max_size * max_size // 4):  # Using a quarter of max_size^2 for sparser population
-            row_offset = random.randint(-max_size//2, max_size//2)
-            col_offset = random.randint(-max_size//2, max_size//2)
-            row = (center_row + row_offset) % self.height
-            col = (center_col + col_offset) % self.width
-            self.grid[(row, col)] = 1
-        
+        self.sim.randomize()
+        self.board_edited()
         self.draw_grid()
-        self.click_sound.play()
+        self.sounds.play("click")
      
     def save_state(self):
         file_path = filedialog.asksaveasfilename(defaultextension=".json",
-                                                 filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+                                                 filetypes=formats.FILETYPES)
         if file_path:
-            state = {
-                "cell_size": self.cell_size,
-                "grid": list(self.grid.keys()),
-                "width": self.width,
-                "height": self.height
-            }
-            with open(file_path, "w") as f:
-                json.dump(state, f)
+            self.sim.save(file_path)
 
     def load_state(self, state=None):
         if not state:
-            file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
-            if file_path:
-                with open(file_path, "r") as f:
-                    state = json.load(f)
-
-        self.cell_size = state["cell_size"]
-        self.grid = {tuple(cell): 1 for cell in state["grid"]}
-        self.width = state["width"]
-        self.height = state["height"]
-        # Update the grid size scale
-        self.grid_size_scale.set(self.cell_size)
-        # Redraw the grid
+            file_path = filedialog.askopenfilename(filetypes=formats.FILETYPES)
+            if not file_path:
+                return
+            self.sim.load(file_path)
+        else:
+            self.sim.load_state(state)
+
+        # Update the grid size scale and the rule the file was saved with
+        self.grid_size_scale.set(self.sim.cell_size)
+        self.rule_choice.set(rule_name(self.sim.rule))
+        # Fit the loaded board to the window and redraw it
+        self.on_resize(None)
+        self.board_edited()
+        self.draw_grid()
+
+    def toggle_recording(self):
+        if self.recording is not None:
+            # The recorder's thread finishes the file; don't wait for it here.
+            self.recording.close(wait=False)
+            self.recording = None
+            self.record_button.config(text="Record")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=recorder.EXTENSION,
+                                                 filetypes=recorder.FILETYPES)
+        if file_path:
+            self.recording = recorder.Recorder(file_path)
+            self.shown_dropped = 0
+            self.record_button.config(text="Stop Rec")
+            self.record_frame()
+
+    def record_frame(self, changed=None):
+        # Only queues the frame; the recorder's thread does the writing.
+        # The board is copied unless the flips of a step are given.
+        if self.recording is not None and self.replay is None:
+            if not self.recording.record_step(self.sim.generation, changed):
+                self.recording.record(self.sim)
+            self.show_dropped_frames()
+
+    def show_dropped_frames(self):
+        # The disk could not keep up; say so on the button instead of
+        # leaving holes in the recording unnoticed.
+        dropped = self.recording.dropped
+        if dropped != self.shown_dropped:
+            self.shown_dropped = dropped
+            self.record_button.config(text=f"Stop Rec ({dropped} dropped)")
+
+    def on_close(self):
+        if self.is_running:
+            self.toggle_play_pause()
+        if self.recording is not None:
+            self.recording.close(wait=False)
+            self.recording = None
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = None
+        if self.producer is not None:
+            self.producer.close()
+            self.producer = None
+        self.sim.engine.close()
+        self.master.destroy()
+
+    def toggle_replay(self):
+        if self.is_running:
+            self.toggle_play_pause()
+        if self.replay is not None:
+            self.replay.close()
+            self.replay = None
+            self.replay_panel.pack_forget()
+            self.replay_button.config(text="Replay")
+            self.board_edited()
+            return
+        file_path = filedialog.askopenfilename(filetypes=recorder.FILETYPES)
+        if not file_path:
+            return
+        self.replay = recorder.Replay(file_path)
+        self.replay_button.config(text="Exit Replay")
+        self.seek_scale.config(to=len(self.replay) - 1)
+        self.replay_panel.pack(side='bottom', fill='x', after=self.control_panel)
+        self.seek_replay(0)
+
+    def seek_replay(self, val):
+        # Setting the scale during playback calls this again for the same frame.
+        if self.replay is None or int(val) == self.replay.frame:
+            return
+        self.replay.seek_frame(int(val))
+        self.show_replay_frame()
+
+    def show_replay_frame(self):
+        self.sim.load_state({"grid": self.replay.cells, "width": self.sim.width, "height": self.sim.height})
+        self.sim.generation = self.replay.generations[self.replay.frame]
+        self.replay_label.config(text=f"Generation {self.sim.generation}")
+        self.seek_scale.set(self.replay.frame)
         self.draw_grid()
 
     def create_pattern(self, pattern_name):
         self.pattern_label.config(text=f"Pattern: {pattern_name}")
-        if pattern_name == "Gosper Glider Gun":
-            self.create_gosper_glider_gun()
-        elif pattern_name == "Pulse":
-            self.create_pluse()
-        elif pattern_name == "Cooper Head":
-            self.create_copperhead()
-        elif pattern_name == "Infinite":
-            self.create_Infinite()
+        self.load_state(self.patterns.load(pattern_name))
 
     def update_grid_size(self, val):
         new_cell_size = int(val)
-        if new_cell_size != self.cell_size:
-            self.cell_size = new_cell_size
-            self.cell_padding = max(1, self.cell_size // 10)
+        if new_cell_size != self.sim.cell_size:
+            self.sim.cell_size = new_cell_size
+            self.cell_padding = max(1, self.sim.cell_size // 10)
             self.on_resize(None)
 
     def toggle_play_pause(self):
         self.is_running = not self.is_running
         self.play_pause_button.config(text="Pause" if self.is_running else "Play")
+        if self.after_id is not None:
+            self.master.after_cancel(self.after_id)
+            self.after_id = None
         if self.is_running:
+            self.scheduler.start()
+            self.tick_due = None
+            self.board_edited()
             self.run_game()
+        elif self.producer is not None:
+            self.producer.pause()
 
     def run_game(self):
         if self.is_running:
-            self.next_frame()
-            self.master.after(int(1000 / self.speed), self.run_game)
+            lag = time.perf_counter() - self.tick_due if self.tick_due is not None else 0.0
+            # Intermediate generations are stepped but never drawn; the
+            # display only refreshes at up to MAX_FPS.
+            if self.replay is not None:
+                with self.metrics.measure("compute"):
+                    generations = self.scheduler.tick(self.replay.next)
+                if not generations and self.replay.frame == len(self.replay) - 1:
+                    # End of the recording.
+                    self.toggle_play_pause()
+                    return
+                if generations:
+                    self.show_replay_frame()
+            elif self.producer_active():
+                with self.metrics.measure("compute"):
+                    generations = self.scheduler.tick(self.take_frame)
+                    if generations:
+                        self.sim.restore(self.producer.latest, self.producer.take_changes())
+                        self.history.push(self.sim, stepped=True)
+                        if self.recording is not None:
+                            if self.recording.needs_board:
+                                self.record_frame()
+                            self.show_dropped_frames()
+                if generations:
+                    self.draw_grid()
+            else:
+                with self.metrics.measure("compute"):
+                    generations = self.scheduler.tick(self.play_step)
+                    if generations:
+                        # One undo entry per frame shown, however many generations it covers.
+                        self.history.push(self.sim, stepped=True)
+                if generations:
+                    self.draw_grid()
+                if self.cycle_mode.get() == "Pause" and self.new_cycle_found():
+                    self.paused_cycle = self.sim.cycles.found_at
+                    self.update_rate_label()
+                    self.toggle_play_pause()
+                    return
+            self.scheduler.frame_done(generations)
+            self.update_rate_label()
+            self.record_metrics(generations, lag)
+            delay = self.scheduler.delay_ms()
+            self.tick_due = time.perf_counter() + delay / 1000
+            self.after_id = self.master.after(delay, self.run_game)
+
+    def record_metrics(self, generations, lag=None):
+        if not self.metrics.active:
+            self.metrics.frame()  # Just drops the section times.
+            return
+        self.metrics.frame(
+            generation=self.sim.generation,
+            generations=generations,
+            population=self.sim.population(),
+            items=len(self.canvas.find_all()),
+            renderer=next(name for name, renderer in self.renderers.items() if renderer is self.renderer),
+            lag_ms=lag * 1000 if lag is not None else None,
+            fps=self.scheduler.achieved_fps if self.is_running else None,
+            target_fps=min(MAX_FPS, self.speed),
+            gps=self.scheduler.achieved_gps if self.is_running else None,
+            target_gps=self.speed,
+        )
+        now = time.perf_counter()
+        if self.metrics.overlay and now - self.overlay_drawn >= OVERLAY_INTERVAL:
+            self.overlay_drawn = now
+            self.draw_metrics()
+
+    def draw_metrics(self):
+        record = self.metrics.history[-1] if self.metrics.history else {}
+        average = self.metrics.average
+
+        def ms(key):
+            value = average(key)
+            return f"{value:.1f}" if value is not None else "-"
+
+        def rate(key):
+            value = record.get(key)
+            return f"{value:.0f}" if value is not None else "-"
+        text = (f"compute {ms('compute_ms')} ms  render {ms('render_ms')} ms  timer lag {ms('lag_ms')} ms\n"
+                f"fps {rate('fps')} / {rate('target_fps')}  gen/s {rate('gps')} / {record.get('target_gps', self.speed):g}\n"
+                f"population {record.get('population', self.sim.population())}  "
+                f"canvas items {record.get('items', len(self.canvas.find_all()))}")
+        if not self.canvas.find_withtag("metrics_text"):
+            self.canvas.create_rectangle(0, 0, 0, 0, fill=self.color_palette["primary"],
+                                         outline=self.color_palette["accent"], tags=("metrics", "metrics_box"))
+            self.canvas.create_text(6, 6, anchor="nw", fill=self.color_palette["accent"], font=("Courier", 10),
+                                    tags=("metrics", "metrics_text"))
+        self.canvas.itemconfigure("metrics_text", text=text)
+        box = self.canvas.bbox("metrics_text")
+        if box:
+            self.canvas.coords("metrics_box", box[0] - 4, box[1] - 4, box[2] + 4, box[3] + 4)
+        self.canvas.tag_raise("metrics")
+
+    def toggle_metrics(self):
+        self.metrics.overlay = self.show_metrics.get()
+        if self.metrics.overlay:
+            self.draw_metrics()
+        else:
+            self.canvas.delete("metrics")
+
+    def play_step(self):
+        self.sim.step()
+        self.record_frame(self.sim.last_changed)
+
+    def take_frame(self):
+        if not self.producer.take():
+            return False
+        # The board only gets the frame after the tick; if the recorder
+        # needs the whole board, run_game records it then.
+        if self.recording is not None:
+            self.recording.record_step(self.producer.latest[0], self.producer.latest_changed)
+        return True
+
+    def new_cycle_found(self):
+        cycles = self.sim.cycles
+        return cycles is not None and cycles.found_at is not None and cycles.found_at != self.paused_cycle
+
+    def producer_active(self):
+        return self.is_running and self.precompute.get() and self.replay is None
+
+    def toggle_precompute(self):
+        if self.precompute.get() and self.producer is None:
+            self.producer = FrameProducer()
+        if self.producer_active():
+            self.board_edited()
+        elif self.producer is not None:
+            self.producer.pause()
+
+    def board_edited(self, stepped=False):
+        # Anything queued was computed from the board before this change.
+        if self.producer_active():
+            self.producer.restart(self.sim.engine.name, self.sim.snapshot(), self.sim.rule)
+        self.record_frame()
+        # Replayed frames are not the user's board, and a paint stroke is
+        # recorded as a whole once the button is released.
+        if self.replay is None and not self.is_selecting:
+            self.history.push(self.sim, stepped)
+
+    def update_rate_label(self):
+        text = f"{self.speed:g} gen/s"
+        if self.is_running:
+            text += f" (got {self.scheduler.achieved_gps:.0f} gen/s, {self.scheduler.achieved_fps:.0f} fps)"
+        cycles = self.sim.cycles
+        if cycles is not None and cycles.period:
+            text += f", period {cycles.period}"
+        self.rate_label.config(text=text)
 
     def next_frame(self):
-        new_grid = {}
-        for i in range(self.height):
-            for j in range(self.width):
-                neighbors = self.count_neighbors(i, j)
-                if (i, j) in self.grid:
-                    if neighbors in [2, 3]:
-                        new_grid[(i, j)] = 1
-                elif neighbors == 3:
-                    new_grid[(i, j)] = 1
-        
-        self.grid = new_grid
+        if self.replay is not None:
+            if self.replay.next():
+                self.show_replay_frame()
+            return
+        with self.metrics.measure("compute"):
+            self.sim.step()
+        self.board_edited(stepped=True)
         self.draw_grid()
+        self.record_metrics(1)
+
+    def previous_frame(self):
+        if self.replay is not None:
+            if self.replay.frame > 0:
+                self.replay.seek_frame(self.replay.frame - 1)
+                self.show_replay_frame()
+            return
+        if self.is_running:
+            self.toggle_play_pause()
+        if self.history.previous_frame(self.sim):
+            self.board_restored()
 
-    def count_neighbors(self, row, col):
-        count = 0
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                if i == 0 and j == 0:
-                    continue
-                r = row + i
-                c = col + j
-                if 0 <= r < self.height and 0 <= c < self.width:
-                    count += (r, c) in self.grid
-        return count
+    def undo(self):
+        if self.replay is not None or self.is_selecting:
+            return
+        if self.is_running:
+            self.toggle_play_pause()
+        if self.history.undo(self.sim) is not None:
+            self.board_restored()
 
-    def clear_grid(self):
-        self.grid.clear()
+    def board_restored(self):
+        self.rule_choice.set(rule_name(self.sim.rule))
+        self.board_edited()
+        self.draw_grid()
+        self.update_rate_label()
+
+    def jump_frames(self):
+        try:
+            power = self.jump_power.get()
+        except tk.TclError:  # Not a number typed into the spinbox
+            return
+        # The spinbox also takes typed values beyond its range.
+        self.sim.jump(max(0, min(JUMP_MAX_POWER, power)))
+        self.board_edited(stepped=True)
         self.draw_grid()
 
-    def update_speed(self, val):
-        self.speed = float(val)
+    def set_engine(self, name):
+        self.sim.set_engine(name)
+        if self.sim.bounded:
+            self.view = (0, 0)
+        self.update_jump_controls()
+        self.board_edited()
+        self.draw_grid()
 
-    def create_gosper_glider_gun(self):
-        data = {'cell_size': 16, 'grid': [[11, 3], [11, 4], [12, 4], [12, 3], [11, 13], [12, 13], [13, 13], [10, 14], [9, 15], [9, 16], [14, 14], [15, 15], [15, 16], [12, 17], [10, 18], [11, 19], [12, 19], [13, 19], [14, 18], [12, 20], [11, 23], [10, 23], [9, 23], [9, 24], [10, 24], [11, 24], [12, 25], [8, 25], [8, 27], [7, 27], [12, 27], [13, 27], [9, 37], [10, 37], [10, 38], [9, 38]], 'width': 43, 'height': 26}
-        self.load_state(data)
+    def update_jump_controls(self):
+        # A bounded board would have to step every generation of the jump.
+        state = "disabled" if self.sim.bounded else "normal"
+        self.jump_button.config(state=state)
+        self.jump_spinbox.config(state=state)
 
-    def create_pluse(self):
-        state = {'cell_size': 16, 'grid': [[7, 12], [7, 13], [8, 12], [9, 12], [8, 11], [9, 11], [10, 11], [7, 15], [7, 16], [8, 16], [9, 16], [9, 17], [8, 17], [10, 17], [12, 13], [11, 13], [13, 13], [11, 8], [12, 8], [13, 8], [11, 15], [12, 15], [13, 15], [14, 16], [14, 17], [14, 18], [11, 20], [12, 20], [13, 20], [14, 12], [14, 11], [14, 10], [16, 10], [16, 11], [16, 12], [16, 16], [16, 17], [16, 18], [17, 20], [18, 20], [19, 20], [17, 8], [18, 8], [19, 8], [21, 10], [21, 11], [21, 12], [21, 16], [21, 17], [21, 18], [19, 13], [18, 13], [17, 13], [17, 15], [18, 15], [19, 15], [7, 30], [7, 31], [7, 32], [7, 36], [7, 37], [7, 38], [9, 35], [10, 35], [11, 35], [9, 33], [10, 33], [11, 33], [9, 40], [10, 40], [11, 40], [9, 28], [10, 28], [11, 28], [12, 30], [12, 31], [12, 32], [12, 36], [12, 37], [12, 38], [14, 36], [14, 37], [14, 38], [14, 32], [14, 31], [14, 30], [15, 33], [16, 33], [17, 33], [15, 35], [16, 35], [17, 35], [15, 40], [16, 40], [17, 40], [15, 28], [16, 28], [17, 28], [19, 30], [19, 31], [19, 32], [19, 36], [19, 37], [19, 38]], 'width': 44, 'height': 32}
-        self.load_state(state)
+    def set_rule(self, name):
+        self.sim.set_rule(RULES.get(name, name))
+        self.board_edited()
+        self.update_rate_label()
 
-    def create_copperhead(self):
-        state = {'cell_size': 20, 'grid': [[9, 6], [10, 6], [9, 7], [10, 7], [8, 9], [9, 9], [10, 9], [11, 9], [8, 10], [7, 10], [12, 10], [11, 10], [13, 11], [6, 11], [6, 13], [6, 14], [8, 14], [11, 14], [9, 15], [9, 16], [10, 16], [10, 15], [13, 14], [13, 13], [11, 17], [12, 17], [8, 17], [7, 17]], 'width': 35, 'height': 21}
-        self.load_state(state)
+    def set_cycle_mode(self, mode):
+        # Precompute mode steps on another thread and is not followed.
+        self.sim.detect_cycles(mode != "Off", loop=mode == "Loop")
+        self.update_rate_label()
 
-    def create_Infinite(self):
-        state = {'cell_size': 5, 'grid': [[56, 82], [56, 84], [55, 84], [54, 86], [53, 86], [52, 86], [53, 88], [52, 88], [51, 88], [52, 89]], 'width': 320, 'height': 153}
-        self.load_state(state)
+    def clear_grid(self):
+        self.sim.clear()
+        self.board_edited()
+        self.draw_grid()
+
+    def update_speed(self, val):
+        self.speed = speed_from_scale(val)
+        self.scheduler.target_gps = self.speed
+        self.update_rate_label()
@@ -0,0 +1,335 @@
+"""
+HashLife engine: the board is a quadtree of canonical (shared) nodes and
+the future of every node is memoised, so repetitive patterns can be
+advanced by huge powers of two in a handful of steps.
+"""
+from engines import Engine
+
+
+class _Node:
+    """
+    A square block of 2**level x 2**level cells. Level 0 nodes are single
+    cells; bigger nodes are built from four quadrants one level down.
+    """
+    __slots__ = ("nw", "ne", "sw", "se", "level", "population")
+
+    def __init__(self, nw, ne, sw, se, level, population):
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.level = level
+        self.population = population
+
+
+class HashLifeEngine(Engine):
+    """
+    Memoised quadtree engine with a "jump 2**k generations" API.
+
+    Unlike the other engines the universe is unbounded: cells keep living
+    past width x height, which are only kept for the caller's benefit.
+    Nodes and results are cached in dicts; once they grow past max_nodes,
+    everything not reachable from the current pattern is evicted so memory
+    stays flat over long sessions.
+
+    Attributes:
+        max_nodes (int): Cache size that triggers an eviction.
+        generation (int): Generations advanced since the last load.
+    """
+    name = "HashLife"
+    bounded = False
+
+    def __init__(self, max_nodes=1000000):
+        super().__init__()
+        self.max_nodes = max_nodes
+        self.generation = 0
+        self._off = _Node(None, None, None, None, 0, 0)
+        self._on = _Node(None, None, None, None, 0, 1)
+        self._nodes = {}
+        self._results = {}
+        self._empty = [self._off]
+        self._limit = max_nodes
+        self.clear()
+
+    def _join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            node = _Node(nw, ne, sw, se, nw.level + 1,
+                         nw.population + ne.population + sw.population + se.population)
+            self._nodes[key] = node
+        return node
+
+    def _empty_node(self, level):
+        while len(self._empty) <= level:
+            empty = self._empty[-1]
+            self._empty.append(self._join(empty, empty, empty, empty))
+        return self._empty[level]
+
+    def _centre(self, node):
+        """Wraps a node in an empty border, returning a node one level up."""
+        empty = self._empty_node(node.level - 1)
+        return self._join(self._join(empty, empty, empty, node.nw),
+                          self._join(empty, empty, node.ne, empty),
+                          self._join(empty, node.sw, empty, empty),
+                          self._join(node.se, empty, empty, empty))
+
+    def _grow(self):
+        half = 1 << (self._root.level - 1)
+        self._root = self._centre(self._root)
+        self._top -= half
+        self._left -= half
+
+    def _is_padded(self, node):
+        """Tells whether every live cell sits in the inner half of the node."""
+        if node.level < 3:
+            return False
+        inner = (node.nw.se.population + node.ne.sw.population +
+                 node.sw.ne.population + node.se.nw.population)
+        return inner == node.population
+
+    def set_rule(self, rule):
+        # Memoised futures only hold for the rule they were computed with.
+        old = self.rule
+        super().set_rule(rule)
+        if self.rule != old:
+            self._results.clear()
+
+    def _life_4x4(self, node):
+        """Advances the centre 2x2 of a level 2 node by one generation."""
+        cells = [
+            [node.nw.nw, node.nw.ne, node.ne.nw, node.ne.ne],
+            [node.nw.sw, node.nw.se, node.ne.sw, node.ne.se],
+            [node.sw.nw, node.sw.ne, node.se.nw, node.se.ne],
+            [node.sw.sw, node.sw.se, node.se.sw, node.se.se],
+        ]
+        alive = [[cell.population for cell in row] for row in cells]
+        table = self.rule.table
+        result = []
+        for row in (1, 2):
+            for col in (1, 2):
+                neighbors = sum(alive[r][c]
+                                for r in (row - 1, row, row + 1)
+                                for c in (col - 1, col, col + 1)) - alive[row][col]
+                lives = table[alive[row][col] * 9 + neighbors]
+                result.append(self._on if lives else self._off)
+        return self._join(*result)
+
+    def _successor(self, node, j):
+        """
+        Returns the centre of the node, one level down, advanced by 2**j
+        generations. j is capped at level - 2, the most a node can see.
+        """
+        if node.population == 0:
+            return node.nw
+        j = min(j, node.level - 2)
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+        if len(self._nodes) + len(self._results) > self._limit:
+            self._collect()
+
+        if node.level == 2:
+            result = self._life_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            join = self._join
+            c1 = self._successor(join(nw.nw, nw.ne, nw.sw, nw.se), j)
+            c2 = self._successor(join(nw.ne, ne.nw, nw.se, ne.sw), j)
+            c3 = self._successor(join(ne.nw, ne.ne, ne.sw, ne.se), j)
+            c4 = self._successor(join(nw.sw, nw.se, sw.nw, sw.ne), j)
+            c5 = self._successor(join(nw.se, ne.sw, sw.ne, se.nw), j)
+            c6 = self._successor(join(ne.sw, ne.se, se.nw, se.ne), j)
+            c7 = self._successor(join(sw.nw, sw.ne, sw.sw, sw.se), j)
+            c8 = self._successor(join(sw.ne, se.nw, sw.se, se.sw), j)
+            c9 = self._successor(join(se.nw, se.ne, se.sw, se.se), j)
+            if j < node.level - 2:
+                # The nine pieces already moved 2**j generations; just
+                # stitch their centres back together.
+                result = join(join(c1.se, c2.sw, c4.ne, c5.nw),
+                              join(c2.se, c3.sw, c5.ne, c6.nw),
+                              join(c4.se, c5.sw, c7.ne, c8.nw),
+                              join(c5.se, c6.sw, c8.ne, c9.nw))
+            else:
+                result = join(self._successor(join(c1, c2, c4, c5), j),
+                              self._successor(join(c2, c3, c5, c6), j),
+                              self._successor(join(c4, c5, c7, c8), j),
+                              self._successor(join(c5, c6, c8, c9), j))
+
+        self._results[key] = result
+        return result
+
+    def _collect(self):
+        """
+        Evicts every cached node and result that the current pattern does
+        not use. Nodes still held by a running jump simply stop being
+        shared, which costs speed but never correctness.
+        """
+        keep = {}
+        stack = [self._root] + self._empty[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key in keep:
+                continue
+            keep[key] = node
+            stack.extend(key)
+        self._nodes = keep
+        self._results = {}
+        # If the live pattern alone fills the cache, give it room to work
+        # instead of evicting again on every call.
+        self._limit = max(self.max_nodes, 2 * len(keep))
+
+    def jump(self, k):
+        """
+        Advances the pattern by 2**k generations in one go.
+
+        Args:
+            k (int): The power of two to advance by.
+        """
+        while self._root.level < k + 2 or not self._is_padded(self._root):
+            self._grow()
+        # One more border so nothing can leave the result square.
+        self._grow()
+        offset = 1 << (self._root.level - 2)
+        self._root = self._successor(self._root, k)
+        self._top += offset
+        self._left += offset
+        self.generation += 1 << k
+
+    def load(self, cells, width, height):
+        self.width = width
+        self.height = height
+        self.generation = 0
+        cells = {tuple(cell) for cell in cells}
+        if not cells:
+            self.clear()
+            return
+
+        top = min(row for row, _ in cells)
+        left = min(col for _, col in cells)
+        nodes = {(row - top, col - left): self._on for row, col in cells}
+        level = 0
+        # Pair blocks up level by level until a single node holds them all.
+        while len(nodes) > 1 or level < 3:
+            empty = self._empty_node(level)
+            parents = {}
+            for (row, col), node in nodes.items():
+                quads = parents.setdefault((row >> 1, col >> 1), [empty] * 4)
+                quads[(row & 1) * 2 + (col & 1)] = node
+            nodes = {key: self._join(*quads) for key, quads in parents.items()}
+            level += 1
+
+        (row, col), self._root = nodes.popitem()
+        self._top = top + (row << level)
+        self._left = left + (col << level)
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+
+    def cells(self):
+        return self.cells_in(self._top, self._left, 1 << self._root.level, 1 << self._root.level)
+
+    def cells_in(self, top, left, height, width):
+        """
+        Lists the live cells inside a rectangle, skipping every quadrant
+        that falls outside it.
+
+        Args:
+            top (int): First row of the rectangle.
+            left (int): First column of the rectangle.
+            height (int): Number of rows in the rectangle.
+            width (int): Number of columns in the rectangle.
+
+        Returns:
+            list: The live (row, col) cells in the rectangle.
+        """
+        bottom = top + height
+        right = left + width
+        found = []
+        stack = [(self._root, self._top, self._left)]
+        while stack:
+            node, row, col = stack.pop()
+            size = 1 << node.level
+            if (node.population == 0 or row >= bottom or col >= right or
+                    row + size <= top or col + size <= left):
+                continue
+            if node.level == 0:
+                found.append((row, col))
+                continue
+            half = size >> 1
+            stack.append((node.nw, row, col))
+            stack.append((node.ne, row, col + half))
+            stack.append((node.sw, row + half, col))
+            stack.append((node.se, row + half, col + half))
+        return found
+
+    def population(self):
+        return self._root.population
+
+    def _contains(self, row, col):
+        size = 1 << self._root.level
+        return (self._top <= row < self._top + size and
+                self._left <= col < self._left + size)
+
+    def is_alive(self, row, col):
+        if not self._contains(row, col):
+            return False
+        node = self._root
+        row -= self._top
+        col -= self._left
+        while node.level > 0:
+            half = 1 << (node.level - 1)
+            if row < half:
+                node = node.nw if col < half else node.ne
+            else:
+                node = node.sw if col < half else node.se
+            row %= half
+            col %= half
+        return node.population == 1
+
+    def _set(self, node, row, col, leaf):
+        if node.level == 0:
+            return leaf
+        half = 1 << (node.level - 1)
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        if row < half:
+            if col < half:
+                nw = self._set(nw, row, col, leaf)
+            else:
+                ne = self._set(ne, row, col - half, leaf)
+        elif col < half:
+            sw = self._set(sw, row - half, col, leaf)
+        else:
+            se = self._set(se, row - half, col - half, leaf)
+        return self._join(nw, ne, sw, se)
+
+    def set_cell(self, row, col, alive=True):
+        while not self._contains(row, col):
+            self._grow()
+        leaf = self._on if alive else self._off
+        self._root = self._set(self._root, row - self._top, col - self._left, leaf)
+
+    def snapshot(self):
+        # Nodes are immutable, so the root is already a full copy.
+        return (self.width, self.height, self._root, self._top, self._left)
+
+    def restore(self, snapshot):
+        self.width, self.height, self._root, self._top, self._left = snapshot
+
+    def clear(self):
+        self._root = self._empty_node(3)
+        self._top = 0
+        self._left = 0
+
+    def step(self, generations=1):
+        k = 0
+        while generations:
+            if generations & 1:
+                self.jump(k)
+            generations >>= 1
+            k += 1
@@ -0,0 +1,140 @@
+"""
+Undo history for the board.
+
+The simulation notes the cells every change flips (see
+Simulation.track_changes()), and History.push() files them as an entry,
+packed (see engines.pack()) into a compact array. No copy of the board
+is kept or compared, so pushing a frame or an edit costs time in
+proportion to the cells that changed, and so does going back, which
+flips the cells of the newest entry back on the live board. Once the
+entries go over the memory budget the oldest are dropped, so a long run
+keeps a fixed amount of history.
+"""
+from collections import deque
+from engines import unpack
+
+# Bytes counted for an entry besides its cells, for the memory budget.
+ENTRY_OVERHEAD = 256
+
+
+class History:
+    """
+    A bounded stack of board changes, newest last.
+
+    Each entry holds the cells a change brought to life or killed, plus
+    the generation and the rule from before it, and whether it came from
+    stepping. The first push() turns on change tracking in the
+    simulation; changes made before it are not recorded.
+
+    Attributes:
+        max_bytes (int): Memory budget of the entries.
+        size (int): Bytes the entries take now, roughly.
+
+    Methods:
+        push(sim, stepped):
+            Records the change since the last push, if any.
+
+        undo(sim):
+            Takes back the newest change.
+
+        previous_frame(sim):
+            Takes back changes up to and including the newest step.
+    """
+    def __init__(self, max_bytes=64 << 20):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = deque()
+        self._generation = 0
+        self._rule = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def can_step_back(self):
+        return any(entry[0] for entry in self._entries)
+
+    def push(self, sim, stepped=False):
+        """
+        Records how the board changed since the last push. Nothing is
+        stored if it did not change, so calling this too often is fine.
+
+        Args:
+            sim (simulation.Simulation): The board.
+            stepped (bool): Whether the change came from stepping, as
+                opposed to an edit, a load or a rule change.
+
+        Returns:
+            bool: Whether an entry was added.
+        """
+        changes = sim.take_changes()
+        generation = self._generation
+        rule = self._rule
+        self._remember(sim)
+        if changes is None:
+            sim.track_changes()
+            return False
+
+        if not changes and generation == sim.generation and rule == sim.rule:
+            return False
+        entry = (stepped, generation, rule, changes)
+        self._entries.append(entry)
+        self.size += self._entry_size(entry)
+        while self.size > self.max_bytes and self._entries:
+            self.size -= self._entry_size(self._entries.popleft())
+        return True
+
+    def undo(self, sim):
+        """
+        Puts the board, its generation and its rule back to how they were
+        before the newest change.
+
+        Args:
+            sim (simulation.Simulation): The board last pushed.
+
+        Returns:
+            bool: Whether the change undone was a step, or None if
+                there was nothing to undo.
+        """
+        # Anything changed since the last push is the newest change.
+        self.push(sim)
+        if not self._entries:
+            return None
+        entry = self._entries.pop()
+        self.size -= self._entry_size(entry)
+        stepped, generation, rule, changes = entry
+
+        sim.set_rule(rule)
+        sim.flip(map(unpack, changes))
+        sim.generation = generation
+        # Going back is not a change to record.
+        sim.take_changes()
+        self._remember(sim)
+        return stepped
+
+    def previous_frame(self, sim):
+        """
+        Goes back one generation: undoes every change up to and including
+        the newest step, so edits made since then are undone too.
+
+        Returns:
+            bool: False if there is no step to go back over.
+        """
+        # Filing changes not pushed yet may drop the oldest step from the
+        # budget, so look for a step only after that.
+        self.push(sim)
+        if not self.can_step_back:
+            return False
+        stepped = False
+        while stepped is False:
+            stepped = self.undo(sim)
+        return stepped is not None
+
+    def _remember(self, sim):
+        self._generation = sim.generation
+        self._rule = sim.rule
+
+    @staticmethod
+    def _entry_size(entry):
+        changes = entry[3]
+        return ENTRY_OVERHEAD + len(changes) * changes.itemsize
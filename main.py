@@ -1,24 +1,74 @@
+from startup import timeline
+import argparse
+import atexit
+import multiprocessing
+import sys
 import tkinter as tk
 from tkinter import Label, Canvas, OptionMenu, StringVar, ttk
-from PIL import Image, ImageTk
-from gol import GameOfLife
+from sounds import SoundBank
 from utils import resource_path
-import pygame
-from pygame import mixer
 import random
+import threading
+import time
+from collections import OrderedDict
+
+# Wait this long after the last resize event before redrawing the gradient.
+GRADIENT_DEBOUNCE_MS = 100
+# Gradient images kept, by window size and palette.
+GRADIENT_CACHE_SIZE = 8
+# Opacity levels the intro fades step through, and how long each fade takes.
+FADE_LEVELS = tuple(range(0, 256, 5))
+FADE_MS = 2550
+# How often a running fade looks at the clock.
+FADE_TICK_MS = 15
+# Wait before the logo fades in, during which its fade frames become Tk
+# images, this many per idle callback.
+INTRO_LEAD_IN_MS = 500
+PHOTOS_PER_IDLE = 4
+
+
+def build_fade_frames(path, size, levels):
+    """
+    Renders an image at every opacity level of a fade.
+
+    Args:
+        path (str): The image file.
+        size (tuple): Width and height to scale it to.
+        levels (sequence): The alpha values, 0 to 255.
+
+    Returns:
+        list: One PIL image per level.
+    """
+    from PIL import Image
+    image = Image.open(path).resize(size, Image.LANCZOS)
+    frames = []
+    for alpha in levels:
+        frame = image.copy()
+        frame.putalpha(alpha)
+        frames.append(frame)
+    return frames
 
 
 class MainApplication:
     """
     Main application class for the Game of Life DropTables application.
     Initializes the main window and sets up the UI.
+
+    Pillow, pygame and the game itself are only imported when first
+    needed, and the audio loads on a background thread, so the window
+    comes up quickly.
     """
-    def __init__(self, root):
+    def __init__(self, root, skip_intro=False, report=None, metrics=None):
         """
         Initializes the MainApplication with the given root window.
 
         Args:
             root (tk.Tk): The root window of the application.
+            skip_intro (bool): Go straight to the menu.
+            report (str, optional): Where to write the startup timeline,
+                "-" for the console.
+            metrics (str, optional): File to append the game's per-frame
+                metrics to.
         """
         self.root = root
         self.root.title("Game Of Life DropTables;")
@@ -36,64 +86,156 @@ class MainApplication:
             "Purple": {"primary": "#2e1e2e", "secondary": "#b489fa", "accent": "#e0cdf4"}
         }
         self.selected_palette = StringVar(value=random.choice(list(self.color_palettes.keys())))
-        self.audio_file = resource_path("assets/music/lofi.mp3")
-        pygame.mixer.init()
-        pygame.mixer.music.load(self.audio_file)
-        pygame.mixer.music.play(-1) 
+        self.report = report
+        self.metrics = metrics
+        self.sounds = SoundBank()
+        self.sounds.play_music()
+        self.sounds.load_async()
         self.is_muted = tk.BooleanVar(value=False)
-        self.bgmusic = pygame.mixer.music
-        
-        self.setup_intro()
+        self.intro_after = None
+        self.gradients = OrderedDict()
+        self.gradient_item = None
+        self.gradient_after = None
+
+        if skip_intro:
+            self.setup_main_ui()
+        else:
+            self.setup_intro()
 
 
     def setup_intro(self):
-        """Cool fading intro."""
+        """
+        Cool fading intro. A click or any key skips it.
+
+        The logo's fade frames are rendered on a background thread and
+        turned into Tk images while the intro waits to start; the fades
+        then only swap images.
+        """
+        timeline.begin("intro")
         self.intro_canvas = tk.Canvas(self.root, bg="black")
         self.intro_canvas.pack(fill="both", expand=True)
+        self.intro_canvas.bind("<Button-1>", self.skip_intro)
+        self.root.bind("<Key>", self.skip_intro)
 
-        self.logo_image = Image.open(resource_path("assets/img/logo.png"))
-        self.logo_image = self.logo_image.resize((200, 200), Image.LANCZOS)
-        self.logo_photo = ImageTk.PhotoImage(self.logo_image)
+        self.intro_frames = None
+        self.intro_photos = [None] * len(FADE_LEVELS)
+        self.intro_shown = None
+        self.intro_loaded = threading.Event()
+        threading.Thread(target=self.load_intro_frames, name="intro-loader", daemon=True).start()
 
-        self.logo_item = self.intro_canvas.create_image(350, 200, image=self.logo_photo, state='hidden')
+        self.logo_item = self.intro_canvas.create_image(350, 200, state='hidden')
         self.team_text = self.intro_canvas.create_text(350, 400, text="DropTables Team;\n        Presents", fill="white", font=("Helvetica", 22), state='hidden')
 
-        self.root.after(500, self.fade_in_logo)
+        self.intro_start = time.perf_counter()
+        self.intro_after = self.root.after(FADE_TICK_MS, self.prepare_intro)
+
+    def skip_intro(self, event=None):
+        """Cuts the intro short and shows the menu."""
+        if self.intro_after is None:
+            return
+        self.root.after_cancel(self.intro_after)
+        self.end_intro()
+
+    def end_intro(self):
+        self.intro_after = None
+        self.root.unbind("<Key>")
+        self.intro_canvas.pack_forget()
+        timeline.end("intro")
+        self.setup_main_ui()
+
+    def load_intro_frames(self):
+        try:
+            with timeline.phase("intro frames"):
+                self.intro_frames = build_fade_frames(resource_path("assets/img/logo.png"), (200, 200), FADE_LEVELS)
+        finally:
+            # Even if rendering failed, so the intro never waits forever;
+            # it then shows the logo without fading it.
+            self.intro_loaded.set()
+
+    def prepare_intro(self):
+        """
+        Turns the fade frames into Tk images a few at a time, which has to
+        happen on this thread, then starts the fade once the lead-in is over.
+        """
+        if not self.intro_loaded.is_set():
+            self.intro_after = self.root.after(FADE_TICK_MS, self.prepare_intro)
+            return
+        if self.intro_frames is not None and None in self.intro_photos:
+            from PIL import ImageTk
+            start = self.intro_photos.index(None)
+            for index in range(start, min(start + PHOTOS_PER_IDLE, len(self.intro_photos))):
+                self.intro_photos[index] = ImageTk.PhotoImage(self.intro_frames[index])
+            self.intro_after = self.root.after_idle(self.prepare_intro)
+            return
+        waited = (time.perf_counter() - self.intro_start) * 1000
+        self.intro_after = self.root.after(max(0, round(INTRO_LEAD_IN_MS - waited)), self.fade_in_logo)
+
+    def animate(self, show, done):
+        """
+        Runs one intro fade. Progress follows the clock rather than the
+        number of ticks, so a slow machine drops frames instead of
+        stretching the intro.
 
-    def fade_in_logo(self, alpha=0):
+        Args:
+            show (function): Called with the fade's progress, 0 to 1.
+            done (function): Called once the fade is over.
+        """
+        start = time.perf_counter()
+
+        def tick():
+            progress = min(1.0, (time.perf_counter() - start) * 1000 / FADE_MS)
+            show(progress)
+            if progress < 1:
+                self.intro_after = self.root.after(FADE_TICK_MS, tick)
+            else:
+                done()
+        tick()
+
+    def show_logo(self, progress):
+        """Shows the logo frame for a point in a fade, 0 to 1."""
+        if self.intro_frames is None:
+            return
+        index = round(progress * (len(FADE_LEVELS) - 1))
+        if index == self.intro_shown:
+            return
+        self.intro_canvas.itemconfig(self.logo_item, image=self.intro_photos[index], state='normal')
+        self.intro_shown = index
+
+    def show_static_logo(self):
+        """Shows the logo as it is, for when its fade frames could not be rendered."""
+        try:
+            self.intro_logo = tk.PhotoImage(file=resource_path("assets/img/logo.png"))
+        except tk.TclError:
+            return
+        self.intro_canvas.itemconfig(self.logo_item, image=self.intro_logo, state='normal')
+
+    def show_team_text(self, progress):
+        alpha = FADE_LEVELS[round(progress * (len(FADE_LEVELS) - 1))]
+        self.intro_canvas.itemconfig(self.team_text, state='normal', fill=f'#{alpha:02x}{alpha:02x}{alpha:02x}')
+
+    def intro_pause(self, ms, next_step):
+        self.intro_after = self.root.after(ms, next_step)
+
+    def fade_in_logo(self):
         """Cool fading logo."""
-        if alpha < 255:
-            alpha += 5
-            logo_image = self.logo_image.copy()
-            logo_image.putalpha(alpha)
-            self.logo_photo = ImageTk.PhotoImage(logo_image)
-            self.intro_canvas.itemconfig(self.logo_item, image=self.logo_photo, state='normal')
-            self.root.after(50, self.fade_in_logo, alpha)
-        else:
-            self.root.after(500, self.fade_in_team_text)
-
-    def fade_in_team_text(self, alpha=0):
+        if self.intro_frames is None:
+            self.show_static_logo()
+            self.intro_pause(500, self.fade_in_team_text)
+            return
+        self.animate(self.show_logo,
+                     lambda: self.intro_pause(500, self.fade_in_team_text))
+
+    def fade_in_team_text(self):
         """Cool fading text for the intro."""
-        if alpha < 255:
-            alpha += 5
-            self.intro_canvas.itemconfig(self.team_text, state='normal', fill=f'#{alpha:02x}{alpha:02x}{alpha:02x}')
-            self.root.after(50, self.fade_in_team_text, alpha)
-        else:
-            self.root.after(1000, self.fade_out_intro)
+        self.animate(self.show_team_text,
+                     lambda: self.intro_pause(1000, self.fade_out_intro))
 
-    def fade_out_intro(self, alpha=255):
+    def fade_out_intro(self):
         """Cool fading text for the intro."""
-        if alpha > 0:
-            alpha -= 5
-            logo_image = self.logo_image.copy()
-            logo_image.putalpha(alpha)
-            self.logo_photo = ImageTk.PhotoImage(logo_image)
-            self.intro_canvas.itemconfig(self.logo_item, image=self.logo_photo)
-            self.intro_canvas.itemconfig(self.team_text, fill=f'#{alpha:02x}{alpha:02x}{alpha:02x}')
-            self.root.after(50, self.fade_out_intro, alpha)
-        else:
-            self.intro_canvas.pack_forget()
-            self.setup_main_ui()
+        def show(progress):
+            self.show_logo(1 - progress)
+            self.show_team_text(1 - progress)
+        self.animate(show, self.end_intro)
 
     def setup_main_ui(self):
         """Start building home page."""
@@ -126,6 +268,7 @@ class MainApplication:
         Binds the resize event to the on_resize method and draws the
         initial gradient.
         """
+        timeline.begin("menu")
         self.style = ttk.Style()
         self.style.theme_use('clam')
         self.canvas = Canvas(self.root)
@@ -142,31 +285,68 @@ class MainApplication:
 
         self.root.bind("<Configure>", self.on_resize)
         self.draw_gradient()
+        timeline.end("menu")
+        # Idle callbacks run once the menu has been drawn.
+        self.root.after_idle(self.menu_ready)
+
+    def menu_ready(self):
+        timeline.mark("interactive")
+        self.write_report()
+
+    def write_report(self):
+        """Prints or saves the startup timeline if --startup-report was given."""
+        if self.report == "-":
+            print(timeline.report(), flush=True)
+        elif self.report:
+            with open(self.report, "w") as f:
+                f.write(timeline.report() + "\n")
 
     def draw_gradient(self):
         """
-        Draws a vertical blue gradient on the canvas.
-        Clears any previous gradient before drawing a new one.
+        Shows the vertical gradient for the current window size and palette
+        on the canvas. Each one is rendered into an image once and cached,
+        so switching back to a palette or size seen before costs nothing.
         """
         height = self.root.winfo_height()
         width = self.root.winfo_width()
-        self.canvas.delete("all")
-        primary_color = self.color_palettes[self.selected_palette.get()]["primary"]
-        secondary_color = self.color_palettes[self.selected_palette.get()]["secondary"]
-        for i in range(0, height, 2):
-            r1, g1, b1 = [int(primary_color[i:i+2], 16) for i in (1, 3, 5)]
-            r2, g2, b2 = [int(secondary_color[i:i+2], 16) for i in (1, 3, 5)]
-            r = int(r1 + (r2 - r1) * i / height)
-            g = int(g1 + (g2 - g1) * i / height)
-            b = int(b1 + (b2 - b1) * i / height)
-            color = f'#{r:02x}{g:02x}{b:02x}'
-            self.canvas.create_line(0, i, width, i, fill=color)
+        if width <= 1 or height <= 1:
+            return
+        key = (width, height, self.selected_palette.get())
+        photo = self.gradients.get(key)
+        if photo is None:
+            photo = self.gradients[key] = self.build_gradient(width, height, key[2])
+            if len(self.gradients) > GRADIENT_CACHE_SIZE:
+                self.gradients.popitem(last=False)
+        else:
+            self.gradients.move_to_end(key)
+
+        if self.gradient_item is None:
+            self.gradient_item = self.canvas.create_image(0, 0, image=photo, anchor="nw", tags="gradient")
+        else:
+            self.canvas.itemconfigure(self.gradient_item, image=photo)
+
+    def build_gradient(self, width, height, palette):
+        """
+        Renders a gradient from the palette's primary colour at the top to
+        its secondary colour at the bottom.
+
+        Returns:
+            ImageTk.PhotoImage: The gradient, width x height pixels.
+        """
+        from PIL import Image, ImageTk
+        top = [int(self.color_palettes[palette]["primary"][i:i+2], 16) for i in (1, 3, 5)]
+        bottom = [int(self.color_palettes[palette]["secondary"][i:i+2], 16) for i in (1, 3, 5)]
+        # One pixel wide column, stretched sideways.
+        column = Image.new("RGB", (1, height))
+        column.putdata([tuple(int(a + (b - a) * y / height) for a, b in zip(top, bottom)) for y in range(height)])
+        return ImageTk.PhotoImage(column.resize((width, height), Image.NEAREST))
 
     def load_logo(self):
         """
         Loads and displays the logo image in the center frame.
         Uses LANCZOS for better quality image resizing.
         """
+        from PIL import Image, ImageTk
         img = Image.open(resource_path("assets/img/logo.png"))
         img = img.resize((200, 200), Image.LANCZOS)
         self.logo_image = ImageTk.PhotoImage(img)
@@ -210,10 +390,10 @@ class MainApplication:
     def toggle_mute(self):
         self.is_muted.set(not self.is_muted.get())
         if self.is_muted.get():
-            pygame.mixer.music.set_volume(0)
+            self.sounds.set_music_volume(0)
             self.mute_button.config(text="Unmute")
         else:
-            pygame.mixer.music.set_volume(1)
+            self.sounds.set_music_volume(1)
             self.mute_button.config(text="Mute")
 
     def create_palette_selector(self):
@@ -267,11 +447,18 @@ class MainApplication:
 
     def on_resize(self, event=None):
         """
-        Handles the window resize event by redrawing the gradient.
+        Handles the window resize event by redrawing the gradient once the
+        window stops changing size for GRADIENT_DEBOUNCE_MS.
 
         Args:
             event (tk.Event, optional): The resize event. Defaults to None.
         """
+        if self.gradient_after is not None:
+            self.root.after_cancel(self.gradient_after)
+        self.gradient_after = self.root.after(GRADIENT_DEBOUNCE_MS, self.redraw_gradient)
+
+    def redraw_gradient(self):
+        self.gradient_after = None
         self.draw_gradient()
 
     def start_game(self):
@@ -279,12 +466,46 @@ class MainApplication:
         Starts the Game of Life by destroying the current UI elements and
         initializing the GameOfLife class.
         """
+        with timeline.phase("import game"):
+            from gol import GameOfLife
+        if self.gradient_after is not None:
+            self.root.after_cancel(self.gradient_after)
+            self.gradient_after = None
         self.frame.destroy()
         self.canvas.destroy()
-        self.game = GameOfLife(self.root, self.color_palettes[self.selected_palette.get()], self.is_muted, self.bgmusic)
+        with timeline.phase("game setup"):
+            self.game = GameOfLife(self.root, self.color_palettes[self.selected_palette.get()], self.is_muted,
+                                   self.sounds, on_ready=self.game_ready)
+        if self.metrics:
+            from metrics import MetricsFile
+            metrics_file = MetricsFile(self.metrics)
+            self.game.metrics.add_hook(metrics_file)
+            atexit.register(metrics_file.close)
+
+    def game_ready(self):
+        timeline.mark("board drawn")
+        self.write_report()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Game Of Life DropTables")
+    parser.add_argument("--fast", action="store_true", help="skip the intro and go straight to the menu")
+    parser.add_argument("--startup-report", nargs="?", const="-", metavar="FILE",
+                        help="print the startup timeline, or write it to FILE")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="append per-frame timings of the game to FILE (JSON lines, rolled over at 1 MB)")
+    # PyInstaller and the OS may pass arguments of their own; ignore them.
+    args, _ = parser.parse_known_args(argv)
+    return args
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = MainApplication(root)
+    # The Tiled engine's worker processes need this in PyInstaller builds.
+    multiprocessing.freeze_support()
+    timeline.mark("imports done")
+    args = parse_args(sys.argv[1:])
+    with timeline.phase("window"):
+        root = tk.Tk()
+        app = MainApplication(root, skip_intro=args.fast, report=args.startup_report,
+                              metrics=args.metrics)
     root.mainloop()
@@ -0,0 +1,135 @@
+"""
+Per-frame performance metrics for the play loop.
+
+The game times the parts of every frame (stepping, redrawing and how
+late the Tk timer woke it up) and hands FrameMetrics one record per
+frame. Records are kept for the on-canvas overlay and passed to any
+hooks, such as a MetricsFile or a profiler of your own, so a slow game
+shows which part is to blame. Nothing is recorded unless the overlay is
+on or a hook is registered.
+"""
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class FrameMetrics:
+    """
+    Collects timed sections of the current frame and closes them into a
+    record once the frame is done.
+
+    Attributes:
+        history (deque): The latest records, oldest first.
+        hooks (list): Callables given every record.
+        overlay (bool): Whether the game shows the overlay, which needs
+            records even without hooks.
+
+    Methods:
+        measure(section):
+            Times a with block and adds it to the section's total for this frame.
+
+        frame(**values):
+            Closes the frame into a record with the section times and the given values.
+
+        add_hook(hook), remove_hook(hook):
+            Register or drop a callable that receives every record.
+
+        average(key):
+            Averages a value over the history.
+    """
+    def __init__(self, history=120, clock=time.perf_counter):
+        self.history = deque(maxlen=history)
+        self.hooks = []
+        self.overlay = False
+        self.clock = clock
+        self._sections = {}
+
+    @property
+    def active(self):
+        return self.overlay or bool(self.hooks)
+
+    @contextmanager
+    def measure(self, section):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self._sections[section] = self._sections.get(section, 0.0) + self.clock() - start
+
+    def frame(self, **values):
+        """
+        Args:
+            **values: Anything else to record, e.g. population or fps.
+
+        Returns:
+            dict: The record, with each section's time in milliseconds
+                as <section>_ms, or None if nothing is listening.
+        """
+        sections, self._sections = self._sections, {}
+        if not self.active:
+            return None
+        record = {"time": time.time()}
+        for section, seconds in sections.items():
+            record[f"{section}_ms"] = seconds * 1000
+        record.update(values)
+        self.history.append(record)
+        for hook in list(self.hooks):
+            hook(record)
+        return record
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        if hook in self.hooks:
+            self.hooks.remove(hook)
+
+    def average(self, key):
+        """
+        Returns:
+            float: The mean of key over the records that have it, or None.
+        """
+        values = [record[key] for record in self.history if record.get(key) is not None]
+        return sum(values) / len(values) if values else None
+
+
+class MetricsFile:
+    """
+    A hook that appends records to a JSON lines file. Lines are buffered
+    and written about once a second, and when the file grows past
+    max_bytes it is moved to <path>.1 and a new one started, so a long
+    session keeps at most two files' worth.
+
+    Attributes:
+        path (str): The file written to.
+        max_bytes (int): Size at which the file is rolled over.
+        flush_interval (float): Seconds between writes.
+    """
+    def __init__(self, path, max_bytes=1 << 20, flush_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._lines = []
+        self._last_flush = clock()
+
+    def __call__(self, record):
+        self._lines.append(json.dumps(record))
+        if self.clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = self.clock()
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+            size = f.tell()
+        if size > self.max_bytes:
+            os.replace(self.path, self.path + ".1")
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,242 @@
+"""
+The pattern library: Life RLE files in assets/patterns.
+
+Opening the library only reads a small index (name, bounding box,
+population and period of every pattern); the patterns themselves are
+parsed when one is picked. Index entries are matched to files by a
+checksum of their contents, so an index stays valid after a checkout, a
+copy or PyInstaller unpacking the files into a new folder. The per-user
+cache remembers the size and modification time each file had when its
+checksum was taken, and a file is only read again when those differ.
+Startup on an unchanged library costs one directory listing; a new
+folder costs one pass of checksums, and only files that were added or
+changed are parsed again.
+
+The index shipped with the patterns is never written at runtime; run
+`python patterns.py` to rebuild it after changing assets/patterns.
+Entries for other files, and the file sizes and times, are kept in the
+per-user cache instead.
+"""
+import json
+import os
+import random
+import sys
+import zlib
+import formats
+from cycles import CycleDetector
+from engines import SparseEngine
+from utils import cache_path, resource_path
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 2
+# Generations to step when looking for a pattern's period.
+PERIOD_SEARCH = 256
+# Empty cells put around a pattern while finding its period, so the board
+# edge does not cut off phases that are wider than the file.
+PERIOD_MARGIN = 16
+
+
+def find_period(cells, width, height, rule=None):
+    """
+    Works out the period of an oscillator or still life (1).
+
+    Args:
+        cells (list): The live (row, col) cells.
+        width (int): Width of the pattern's board.
+        height (int): Height of the pattern's board.
+        rule (str, optional): The pattern's rule; Conway's by default.
+
+    Returns:
+        int: The period, or None if the pattern does not come back to its
+            starting state within PERIOD_SEARCH generations.
+    """
+    engine = SparseEngine()
+    if rule:
+        engine.set_rule(rule)
+    engine.load([(row + PERIOD_MARGIN, col + PERIOD_MARGIN) for row, col in cells],
+                width + 2 * PERIOD_MARGIN, height + 2 * PERIOD_MARGIN)
+    cycles = CycleDetector(history=PERIOD_SEARCH + 1)
+    cycles.start(engine.cells(), 0)
+    for generation in range(1, PERIOD_SEARCH + 1):
+        engine.step()
+        period = cycles.update(engine.flips(), generation)
+        if period is not None:
+            # A cycle that starts later means the pattern changed first.
+            return period if generation == period else None
+    return None
+
+
+def index_entry(file_path, data):
+    """
+    Reads one pattern file for the index.
+
+    Args:
+        file_path (str): The pattern file.
+        data (bytes): Its contents.
+
+    Returns:
+        dict: name, bbox (top, left, bottom, right or None when empty),
+            population, period, width and height of the pattern.
+    """
+    state = formats.decode_rle(data.decode("utf-8"))
+    cells = [tuple(cell) for cell in state["grid"]]
+    rows = [row for row, _ in cells]
+    cols = [col for _, col in cells]
+    return {
+        "name": state.get("name") or os.path.splitext(os.path.basename(file_path))[0],
+        "bbox": [min(rows), min(cols), max(rows), max(cols)] if cells else None,
+        "population": len(cells),
+        "period": find_period(cells, state["width"], state["height"], state.get("rule")),
+        "width": state["width"],
+        "height": state["height"],
+    }
+
+
+class PatternLibrary:
+    """
+    A directory of .rle pattern files and its index.
+
+    Attributes:
+        directory (str): Where the pattern files are.
+        index_path (str): The index shipped with the files, only read.
+        cache_path (str): Where entries missing from that index are kept,
+            with the size, modification time and checksum of every file.
+
+    Methods:
+        entries():
+            Returns the index entries by pattern name, building the index on first use.
+
+        names():
+            Lists the pattern names.
+
+        load(name):
+            Parses a pattern into a state dict for Simulation.load_state().
+
+        random_name(rng):
+            Picks a pattern name at random.
+
+        write_index():
+            Writes the index for the files as they are to index_path.
+    """
+    def __init__(self, directory=None, index_path=None, cache_path=None):
+        self.directory = directory or resource_path("assets/patterns")
+        self.index_path = index_path or os.path.join(self.directory, INDEX_NAME)
+        self.cache_path = cache_path
+        self._entries = None
+
+    def entries(self):
+        if self._entries is None:
+            self.refresh()
+        return self._entries
+
+    def names(self):
+        return sorted(self.entries())
+
+    def refresh(self):
+        """Brings the index up to date with the files on disk."""
+        shipped = _read_index(self.index_path).get("files", {})
+        cache_file = self.cache_path or _default_cache_path(self.directory)
+        cache = _read_index(cache_file) if cache_file else {}
+        cached = cache.get("files", {})
+        seen = cache.get("stats", {})
+        known = dict(shipped, **cached)
+
+        current = {}
+        stats = {}
+        for item in os.scandir(self.directory):
+            if not item.name.lower().endswith(".rle") or not item.is_file():
+                continue
+            stat = item.stat()
+            stamp = [stat.st_size, stat.st_mtime_ns]
+            entry = known.get(item.name)
+            if entry is not None and seen.get(item.name) == stamp + [entry["crc"]]:
+                # Not touched since its checksum was taken.
+                stats[item.name] = seen[item.name]
+                current[item.name] = entry
+                continue
+            with open(item.path, "rb") as f:
+                data = f.read()
+            crc = zlib.crc32(data)
+            if entry is None or entry["crc"] != crc:
+                entry = index_entry(item.path, data)
+                entry["crc"] = crc
+            stats[item.name] = stamp + [crc]
+            current[item.name] = entry
+
+        # Only files the shipped index does not describe go to the cache.
+        extra = {name: entry for name, entry in current.items() if shipped.get(name) != entry}
+        if cache_file and (extra != cached or stats != seen):
+            try:
+                _write_index(cache_file, extra, stats)
+            except OSError:
+                pass  # Without a cache it still works, it just reads them again next time.
+
+        self._files = {entry["name"]: file_name for file_name, entry in current.items()}
+        self._entries = {entry["name"]: entry for entry in current.values()}
+
+    def write_index(self):
+        self._entries = None
+        self.refresh()
+        _write_index(self.index_path, {self._files[name]: entry for name, entry in self._entries.items()})
+
+    def load(self, name):
+        """
+        Args:
+            name (str): A pattern name from the index.
+
+        Returns:
+            dict: The pattern as a state dict.
+        """
+        self.entries()
+        return formats.load(os.path.join(self.directory, self._files[name]))
+
+    def random_name(self, rng=random):
+        names = self.names()
+        return rng.choice(names) if names else None
+
+
+def _read_index(index_path):
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) and index.get("version") == INDEX_VERSION else {}
+
+
+def _write_index(index_path, files, stats=None):
+    index = {"version": INDEX_VERSION, "files": files}
+    if stats is not None:
+        index["stats"] = stats
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def _default_cache_path(directory):
+    # One cache per library directory; None if there is nowhere to put it.
+    try:
+        return cache_path(f"patterns-{zlib.crc32(os.path.abspath(directory).encode()):08x}.json")
+    except OSError:
+        return None
+
+
+_default = None
+
+
+def default_library():
+    """
+    Returns:
+        PatternLibrary: The library shipped in assets/patterns, shared.
+    """
+    global _default
+    if _default is None:
+        _default = PatternLibrary()
+    return _default
+
+
+if __name__ == "__main__":
+    # Rebuilds the index shipped in assets/patterns, e.g. after adding a pattern.
+    library = PatternLibrary(sys.argv[1] if len(sys.argv) > 1 else None)
+    library.write_index()
+    print(f"Indexed {len(library.names())} patterns in {library.index_path}")
@@ -0,0 +1,138 @@
+"""
+Background precomputation of upcoming generations.
+
+A worker thread steps its own engine ahead of the display and pushes
+snapshots into a bounded queue; the Tk loop only takes finished frames
+and draws them, so it never blocks on a heavy step.
+"""
+import queue
+import threading
+from engines import create_engine
+from rules import CONWAY
+
+
+class FrameProducer:
+    """
+    Producer side of the play loop. Every restart() bumps an epoch; frames
+    computed from an older seed are dropped, so edits, Clear and Load can
+    invalidate the queue at any time without locking the worker out.
+
+    Attributes:
+        frames (queue.Queue): Finished (epoch, generation, snapshot,
+            changed) frames, changed being the packed cells the step flipped.
+        latest (tuple): The last frame handed out by take(), as
+            (generation, snapshot), or None after a restart.
+        latest_changed (iterable): The packed cells the step to latest
+            flipped.
+    """
+    def __init__(self, depth=64):
+        self.frames = queue.Queue(maxsize=depth)
+        self.latest = None
+        self.latest_changed = None
+        self._changed = set()
+        self._wake = threading.Condition()
+        self._epoch = 0
+        self._seed = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="frame-producer", daemon=True)
+        self._thread.start()
+
+    def restart(self, engine_name, snapshot, rule=CONWAY):
+        """
+        Throws away queued frames and starts computing from a new board.
+
+        Args:
+            engine_name (str): The engine type the snapshot came from.
+            snapshot (tuple): A Simulation.snapshot() to start from.
+            rule (rules.Rule): The rule to step by.
+        """
+        with self._wake:
+            self._epoch += 1
+            self._seed = (self._epoch, engine_name, snapshot, rule)
+            self.latest = None
+            self._changed = set()
+            self._drain()
+            self._wake.notify()
+
+    def pause(self):
+        """Stops the worker and throws away queued frames."""
+        with self._wake:
+            self._epoch += 1
+            self._seed = None
+            self.latest = None
+            self._changed = set()
+            self._drain()
+
+    def close(self):
+        with self._wake:
+            self._closed = True
+            self._epoch += 1
+            self._drain()
+            self._wake.notify()
+
+    def _drain(self):
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                return
+
+    def take(self):
+        """
+        Moves the next finished frame into latest without waiting.
+
+        Returns:
+            bool: False if no current frame was ready.
+        """
+        while True:
+            try:
+                epoch, generation, snapshot, changed = self.frames.get_nowait()
+            except queue.Empty:
+                return False
+            if epoch == self._epoch:
+                self.latest = (generation, snapshot)
+                self.latest_changed = changed
+                self._changed.symmetric_difference_update(changed)
+                return True
+
+    def take_changes(self):
+        """
+        Returns:
+            set: The packed cells the frames taken since the last call
+                flipped, counting from the board the producer started on.
+        """
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def _run(self):
+        engine = None
+        while True:
+            with self._wake:
+                while self._seed is None and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    break
+                epoch, engine_name, (generation, snapshot), rule = self._seed
+                self._seed = None
+
+            if engine is None or engine.name != engine_name:
+                if engine is not None:
+                    engine.close()
+                engine = create_engine(engine_name)
+            engine.set_rule(rule)
+            engine.restore(snapshot)
+
+            while epoch == self._epoch:
+                engine.step()
+                generation += 1
+                frame = (epoch, generation, engine.snapshot(), engine.changed())
+                # Wait for room, but notice a restart while the queue is full.
+                while epoch == self._epoch:
+                    try:
+                        self.frames.put(frame, timeout=0.05)
+                        break
+                    except queue.Full:
+                        pass
+
+        if engine is not None:
+            engine.close()
@@ -0,0 +1,372 @@
+"""
+Recording of whole runs, one generation at a time, and replay of them.
+
+A recording is an append-only file of frames. Most frames only store the
+births and deaths since the frame before; every so often a keyframe
+stores the whole board, so seeking never has to replay more than one
+keyframe interval of deltas.
+
+File layout:
+    header: MAGIC and VERSION.
+    keyframe: FRAME (b"K", generation, width, height), a 4 byte length,
+        then the board in the binary format from formats.py.
+    unbounded keyframe: FRAME (b"L", generation, width, height), a 4 byte
+        cell count, then the cells as row, col int32 pairs, for universes
+        whose cells may lie outside width x height.
+    delta: FRAME (b"D", generation, births, deaths), then the born and
+        the dead cells as row, col int32 pairs.
+"""
+import bisect
+import queue
+import struct
+import threading
+from array import array
+import formats
+from engines import unpack
+
+MAGIC = b"GOLR"
+VERSION = 1
+HEADER = struct.Struct("<4sB")
+FRAME = struct.Struct("<cqII")
+LENGTH = struct.Struct("<I")
+
+# Bytes counted for a queued frame per cell and besides its cells, for
+# the recorder's queue budget.
+CELL_BYTES = 8
+FRAME_OVERHEAD = 256
+
+# Extension and filetypes for the Record/Replay dialogs.
+EXTENSION = ".golrec"
+FILETYPES = [("Recordings", "*.golrec"), ("All files", "*.*")]
+
+
+def _pack_cells(cells):
+    flat = array("i")
+    for row, col in cells:
+        flat.append(row)
+        flat.append(col)
+    return flat.tobytes()
+
+
+def _pack_keys(keys):
+    flat = array("i")
+    for key in keys:
+        flat.extend(unpack(key))
+    return flat.tobytes()
+
+
+def _unpack_cells(data):
+    flat = array("i")
+    flat.frombytes(data)
+    return zip(flat[::2], flat[1::2])
+
+
+class Recorder:
+    """
+    Streams frames to a recording from a background thread. A step is
+    queued as the packed cells it flipped (see engines.pack()), which the
+    simulation works out anyway, so recording costs the play loop time in
+    proportion to the cells that changed; the board is only copied for
+    edits and loads, and to pick up again after a gap. The writer thread
+    keeps its own copy of the board to split the flips into births and
+    deaths and to write keyframes from.
+
+    The queue is bounded by bytes. If the writer falls too far behind,
+    frames are dropped rather than stalling play, and the next frame
+    written is a keyframe, so a replay jumps over the gap instead of
+    running deltas across it. The count of dropped frames is kept in
+    dropped for the GUI to show.
+
+    Attributes:
+        file_path (str): The recording being written.
+        keyframe_interval (int): Frames between two keyframes.
+        max_bytes (int): How much the queued frames may take.
+        dropped (int): Frames dropped because the queue was full.
+        needs_board (bool): Whether the next frame has to come through
+            record(), at the start and after frames were dropped.
+    """
+    def __init__(self, file_path, keyframe_interval=100, max_bytes=64 << 20):
+        self.file_path = file_path
+        self.keyframe_interval = keyframe_interval
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.needs_board = True
+        self.frames = queue.Queue()
+        self._queued = 0
+        self._lock = threading.Lock()
+        # dropped as of the last frame queued.
+        self._queued_dropped = 0
+        self._file = open(file_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION))
+        self._closing = threading.Event()
+        # Not a daemon, so frames still queued at exit are written out.
+        self._thread = threading.Thread(target=self._run, name="recorder")
+        self._thread.start()
+
+    def record(self, sim):
+        """
+        Queues the whole board as a frame without waiting.
+
+        Args:
+            sim (simulation.Simulation): The board.
+        """
+        # Check for room before copying anything.
+        if not self._reserve(sim.population() * CELL_BYTES):
+            return
+        cells = array("q", sim.engine.packed())
+        self._put((sim.generation, (sim.width, sim.height, sim.bounded), cells, True))
+        self.needs_board = False
+
+    def record_step(self, generation, changed):
+        """
+        Queues a frame from the cells a step flipped, without waiting. The
+        board size must not have changed since the last frame.
+
+        Args:
+            generation (int): The generation the step led to.
+            changed (iterable): Packed cells the step flipped, e.g.
+                Simulation.last_changed.
+
+        Returns:
+            bool: False if the frame has to be recorded with record()
+                instead, see needs_board.
+        """
+        if self.needs_board or changed is None:
+            return False
+        changed = array("q", changed)
+        if self._reserve(len(changed) * CELL_BYTES):
+            self._put((generation, None, changed, False))
+        else:
+            self.needs_board = True
+        return True
+
+    def _reserve(self, size):
+        # Makes room for a frame in the byte budget, or counts it dropped.
+        # A frame bigger than the budget still goes into an empty queue.
+        size += FRAME_OVERHEAD
+        with self._lock:
+            if self._queued and self._queued + size > self.max_bytes:
+                self.dropped += 1
+                return False
+            self._queued += size
+            return True
+
+    def _put(self, item):
+        gap = self.dropped != self._queued_dropped
+        self._queued_dropped = self.dropped
+        self.frames.put(item + (gap,))
+
+    def close(self, wait=True):
+        """
+        Stops recording. The writer thread writes out the queued frames
+        and then closes the file.
+
+        Args:
+            wait (bool): Whether to wait until the file is closed. The GUI
+                passes False so the window never waits on the disk.
+        """
+        self._closing.set()
+        if wait:
+            self._thread.join()
+
+    def _run(self):
+        self._generation = None
+        self._shape = None
+        self._cells = set()
+        self._since_keyframe = 0
+        main = threading.main_thread()
+        while True:
+            try:
+                item = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                # Stop once closed, or once the program is exiting without
+                # having closed the recording.
+                if self._closing.is_set() or not main.is_alive():
+                    break
+                continue
+            generation, shape, cells, whole, gap = item
+            with self._lock:
+                self._queued -= len(cells) * CELL_BYTES + FRAME_OVERHEAD
+            if whole:
+                self._write_board(generation, shape, set(cells), gap)
+            else:
+                self._write_step(generation, cells)
+            if self.frames.empty():
+                self._file.flush()
+        self._file.close()
+
+    def _write_board(self, generation, shape, cells, gap):
+        previous = self._cells
+        # The play button and repeated edits report the same board twice.
+        if (generation, shape) == (self._generation, self._shape) and cells == previous:
+            return
+        same_size = shape == self._shape
+        self._generation = generation
+        self._shape = shape
+        self._cells = cells
+        if same_size and not gap and self._since_keyframe < self.keyframe_interval:
+            self._write_delta(cells - previous, previous - cells)
+        else:
+            self._write_keyframe()
+
+    def _write_step(self, generation, changed):
+        cells = self._cells
+        births = [key for key in changed if key not in cells]
+        deaths = [key for key in changed if key in cells]
+        cells.symmetric_difference_update(changed)
+        self._generation = generation
+        if self._since_keyframe < self.keyframe_interval:
+            self._write_delta(births, deaths)
+        else:
+            self._write_keyframe()
+
+    def _write_delta(self, births, deaths):
+        self._file.write(FRAME.pack(b"D", self._generation, len(births), len(deaths)))
+        self._file.write(_pack_keys(births))
+        self._file.write(_pack_keys(deaths))
+        self._since_keyframe += 1
+
+    def _write_keyframe(self):
+        width, height, bounded = self._shape
+        cells = [unpack(key) for key in self._cells]
+        if bounded:
+            board = formats.encode_binary({"cell_size": 0, "grid": cells, "width": width, "height": height})
+            self._file.write(FRAME.pack(b"K", self._generation, width, height))
+            self._file.write(LENGTH.pack(len(board)))
+            self._file.write(board)
+        else:
+            self._file.write(FRAME.pack(b"L", self._generation, width, height))
+            self._file.write(LENGTH.pack(len(cells)))
+            self._file.write(_pack_cells(cells))
+        self._since_keyframe = 0
+
+
+class Replay:
+    """
+    Reads a recording back. Opening it only scans the frame headers; cells
+    are read when a frame is shown. Stepping forward applies one delta,
+    and seeking starts from the nearest keyframe at or before the target.
+
+    Attributes:
+        generations (list): The generation of every frame, in file order.
+        frame (int): The frame currently shown, or -1 before the first.
+        cells (set): The live (row, col) cells of the current frame.
+        width (int): Board width of the current frame.
+        height (int): Board height of the current frame.
+    """
+    def __init__(self, file_path):
+        self._file = open(file_path, "rb")
+        magic, version = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Game of Life recording")
+        self.generations = []
+        self._offsets = []
+        self._keyframes = []
+        self._index()
+        if not self.generations:
+            raise ValueError("The recording has no frames")
+        self.frame = -1
+        self.cells = set()
+        self.width = 0
+        self.height = 0
+
+    def _index(self):
+        f = self._file
+        f.seek(0, 2)
+        end = f.tell()
+        f.seek(HEADER.size)
+        while True:
+            offset = f.tell()
+            header = f.read(FRAME.size)
+            if len(header) < FRAME.size:
+                break
+            kind, generation, a, b = FRAME.unpack(header)
+            if kind in (b"K", b"L"):
+                length = f.read(LENGTH.size)
+                if len(length) < LENGTH.size:
+                    break
+                size = LENGTH.unpack(length)[0] * (8 if kind == b"L" else 1)
+            else:
+                size = (a + b) * 8
+            f.seek(size, 1)
+            if f.tell() > end:
+                # A frame cut short by a crash mid-write.
+                break
+            if kind in (b"K", b"L"):
+                self._keyframes.append(len(self._offsets))
+            self._offsets.append(offset)
+            self.generations.append(generation)
+        # Where each generation was last seen, for seek().
+        self._last_frame = {generation: frame for frame, generation in enumerate(self.generations)}
+        self._known = sorted(self._last_frame)
+
+    def __len__(self):
+        return len(self.generations)
+
+    def close(self):
+        self._file.close()
+
+    def _read(self, frame):
+        f = self._file
+        f.seek(self._offsets[frame])
+        kind, generation, a, b = FRAME.unpack(f.read(FRAME.size))
+        if kind == b"K":
+            length = LENGTH.unpack(f.read(LENGTH.size))[0]
+            state = formats.decode_binary(f.read(length))
+            self.cells = {tuple(cell) for cell in state["grid"]}
+            self.width = a
+            self.height = b
+        elif kind == b"L":
+            count = LENGTH.unpack(f.read(LENGTH.size))[0]
+            self.cells = set(_unpack_cells(f.read(count * 8)))
+            self.width = a
+            self.height = b
+        else:
+            self.cells.update(_unpack_cells(f.read(a * 8)))
+            self.cells.difference_update(_unpack_cells(f.read(b * 8)))
+        self.frame = frame
+
+    def seek_frame(self, frame):
+        """
+        Shows a frame by its position in the file.
+
+        Args:
+            frame (int): 0 for the first frame, up to len(self) - 1.
+
+        Returns:
+            int: The generation of the frame.
+        """
+        frame = max(0, min(frame, len(self) - 1))
+        keyframe = self._keyframes[bisect.bisect_right(self._keyframes, frame) - 1]
+        # Carry on from the current frame when it is on the way.
+        start = self.frame + 1 if keyframe <= self.frame <= frame else keyframe
+        for i in range(start, frame + 1):
+            self._read(i)
+        return self.generations[frame]
+
+    def seek(self, generation):
+        """
+        Shows the last frame recorded at a generation, or at the closest
+        generation before it. Clear and Load start the count again, so a
+        generation can appear more than once in a recording.
+
+        Args:
+            generation (int): The generation to go to.
+
+        Returns:
+            int: The generation actually shown.
+        """
+        i = bisect.bisect_right(self._known, generation) - 1
+        return self.seek_frame(self._last_frame[self._known[max(i, 0)]])
+
+    def next(self):
+        """
+        Moves to the next frame.
+
+        Returns:
+            bool: False at the end of the recording.
+        """
+        if self.frame + 1 >= len(self):
+            return False
+        self.seek_frame(self.frame + 1)
+        return True
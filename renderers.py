@@ -0,0 +1,303 @@
+"""
+Canvas renderers for the Game of Life board.
+
+The background and grid lines live in a GridLayer that is only rebuilt
+when the board layout changes. Each frame GameOfLife hands the active
+renderer the live cells, and the renderer decides how much of the canvas
+actually has to change.
+"""
+try:
+    from PIL import Image, ImageChops, ImageDraw, ImageTk
+except ImportError:  # Pillow is optional here, the bitmap renderer is off without it
+    Image = None
+
+
+class GridLayer:
+    """
+    The board background and grid lines, kept on the canvas as a
+    persistent layer. They only depend on the board layout, so they are
+    built once per layout and reused across frames and edits.
+
+    Attributes:
+        canvas (tk.Canvas): The canvas to draw on.
+        color_palette (dict): Colors for the background and lines.
+    """
+    def __init__(self, canvas, color_palette):
+        self.canvas = canvas
+        self.color_palette = color_palette
+
+    def build(self, width, height, cell_size):
+        """
+        Replaces the background and lines with ones for a new layout.
+
+        Args:
+            width (int): Number of columns on the board.
+            height (int): Number of rows on the board.
+            cell_size (int): Cell size in pixels.
+        """
+        self.canvas.delete("background", "gridline")
+        background = self.canvas.create_rectangle(0, 0, width * cell_size, height * cell_size,
+                                                  fill=self.color_palette["primary"], width=0,
+                                                  tags="background")
+        self.canvas.tag_lower(background)
+
+        for i in range(0, width * cell_size + 1, cell_size):
+            self.canvas.create_line(i, 0, i, height * cell_size, fill=self.color_palette["accent"],
+                                    tags="gridline")
+        for i in range(0, height * cell_size + 1, cell_size):
+            self.canvas.create_line(0, i, width * cell_size, i, fill=self.color_palette["accent"],
+                                    tags="gridline")
+
+    def show(self, visible=True):
+        state = "normal" if visible else "hidden"
+        self.canvas.itemconfigure("background", state=state)
+        self.canvas.itemconfigure("gridline", state=state)
+
+    def raise_lines(self):
+        """Puts the lines back on top of anything created since."""
+        self.canvas.tag_raise("gridline")
+
+
+class CanvasRenderer:
+    """
+    Retained-mode renderer that keeps one rectangle item per live cell,
+    drawn between the background and the lines of a GridLayer.
+
+    Each frame it diffs the new live cells against the ones already on
+    screen and only hides, shows or moves the items whose cells changed.
+    Hidden items go back to a pool and get reused for the next births, so
+    Tk rarely has to create or delete anything. Its items are only thrown
+    away when the board layout changes.
+
+    Attributes:
+        canvas (tk.Canvas): The canvas to draw on.
+        color_palette (dict): Colors for the cells.
+        grid_layer (GridLayer): The background and lines drawn around the cells.
+        items (dict): Canvas item id of each visible cell, by (row, col).
+        pool (list): Hidden cell items ready to be reused.
+    """
+    def __init__(self, canvas, color_palette, grid_layer):
+        self.canvas = canvas
+        self.color_palette = color_palette
+        self.grid_layer = grid_layer
+        self.geometry = None
+        self.items = {}
+        self.pool = []
+
+    def invalidate(self):
+        """Forces a rebuild on the next frame, e.g. after the layout changed."""
+        self.geometry = None
+
+    def set_geometry(self, width, height, cell_size, cell_padding):
+        """
+        Drops the cell items if the board layout changed since the last call.
+
+        Args:
+            width (int): Number of columns on the board.
+            height (int): Number of rows on the board.
+            cell_size (int): Cell size in pixels.
+            cell_padding (int): Gap in pixels between a cell and its grid lines.
+        """
+        geometry = (width, height, cell_size, cell_padding)
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.rebuild()
+
+    def rebuild(self):
+        self.canvas.delete("cell")
+        self.items = {}
+        self.pool = []
+        self.grid_layer.show()
+
+    def detach(self):
+        """Removes this renderer's items when another renderer takes over."""
+        self.canvas.delete("cell")
+        self.items = {}
+        self.pool = []
+        self.invalidate()
+
+    def cell_box(self, row, col):
+        _, _, cell_size, cell_padding = self.geometry
+        return (col * cell_size + cell_padding,
+                row * cell_size + cell_padding,
+                (col + 1) * cell_size - cell_padding,
+                (row + 1) * cell_size - cell_padding)
+
+    def show_cell(self, row, col):
+        """
+        Makes a cell visible, reusing a pooled item when there is one.
+
+        Returns:
+            bool: True if a new canvas item had to be created.
+        """
+        if (row, col) in self.items:
+            return False
+        created = not self.pool
+        if created:
+            item = self.canvas.create_rectangle(*self.cell_box(row, col), tags="cell",
+                                                fill=self.color_palette["secondary"], width=0)
+        else:
+            item = self.pool.pop()
+            self.canvas.coords(item, *self.cell_box(row, col))
+            self.canvas.itemconfigure(item, state="normal")
+        self.items[(row, col)] = item
+        return created
+
+    def show_cells(self, cells):
+        """Shows a batch of cells, e.g. a paint stroke, raising the lines once."""
+        created = False
+        for row, col in cells:
+            created |= self.show_cell(row, col)
+        if created:
+            self.grid_layer.raise_lines()
+
+    def hide_cell(self, row, col):
+        item = self.items.pop((row, col), None)
+        if item is not None:
+            self.canvas.itemconfigure(item, state="hidden")
+            self.pool.append(item)
+
+    def render(self, cells):
+        """
+        Brings the canvas in line with the given live cells.
+
+        Args:
+            cells (iterable): The live (row, col) cells.
+        """
+        if not isinstance(cells, (set, frozenset, type({}.keys()))):
+            cells = set(cells)
+        for cell in [cell for cell in self.items if cell not in cells]:
+            self.hide_cell(*cell)
+
+        created = False
+        for cell in cells:
+            if cell not in self.items:
+                created |= self.show_cell(*cell)
+        # New items land on top of the stack; keep the grid lines above them.
+        if created:
+            self.grid_layer.raise_lines()
+
+
+class ImageRenderer:
+    """
+    Draws the whole board into one image shown as a single canvas item,
+    for big boards and small cell sizes where thousands of rectangle items
+    would make Tk the bottleneck. The GridLayer is hidden meanwhile, as
+    the image has its own background and lines baked in.
+
+    The background, grid lines and a mask of the padded cell interiors are
+    built once per layout and kept when switching renderers. Each frame
+    paints one pixel per cell, scales that up by cell_size and pastes the
+    cell colour through the mask, so the grid lines and cell_padding look
+    just like the canvas renderer.
+
+    Attributes:
+        canvas (tk.Canvas): The canvas to draw on.
+        color_palette (dict): Colors for the background, cells and lines.
+        grid_layer (GridLayer): The canvas grid, hidden while the image shows.
+    """
+    def __init__(self, canvas, color_palette, grid_layer):
+        self.canvas = canvas
+        self.color_palette = color_palette
+        self.grid_layer = grid_layer
+        self.geometry = None
+        self.built = None
+        self.frame = None
+        self.photo = None
+        self.item = None
+
+    @staticmethod
+    def available():
+        return Image is not None
+
+    def invalidate(self):
+        """Forces a rebuild on the next frame, e.g. after the layout changed."""
+        self.geometry = None
+
+    def set_geometry(self, width, height, cell_size, cell_padding):
+        """
+        Puts the board image on the canvas, rebuilding its background and
+        cell mask only if the layout changed since they were built.
+
+        Args:
+            width (int): Number of columns on the board.
+            height (int): Number of rows on the board.
+            cell_size (int): Cell size in pixels.
+            cell_padding (int): Gap in pixels between a cell and its grid lines.
+        """
+        geometry = (width, height, cell_size, cell_padding)
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.rebuild()
+
+    def rebuild(self):
+        if self.built != (self.geometry, self.color_palette["primary"], self.color_palette["accent"]):
+            self.build_layers()
+        self.frame = self.background.copy()
+        self.photo = ImageTk.PhotoImage(self.frame)
+        self.canvas.delete("board_image")
+        self.grid_layer.show(False)
+        self.item = self.canvas.create_image(0, 0, image=self.photo, anchor="nw", tags="board_image")
+
+    def build_layers(self):
+        """Builds the background with grid lines and the padded cell mask."""
+        width, height, cell_size, cell_padding = self.geometry
+        pixel_width = max(1, width * cell_size)
+        pixel_height = max(1, height * cell_size)
+
+        self.background = Image.new("RGB", (pixel_width + 1, pixel_height + 1), self.color_palette["primary"])
+        draw = ImageDraw.Draw(self.background)
+        for i in range(0, width * cell_size + 1, cell_size):
+            draw.line([(i, 0), (i, pixel_height)], fill=self.color_palette["accent"])
+        for i in range(0, height * cell_size + 1, cell_size):
+            draw.line([(0, i), (pixel_width, i)], fill=self.color_palette["accent"])
+
+        # One cell's interior, tiled into a row and then into the board.
+        tile = Image.new("L", (cell_size, cell_size), 0)
+        ImageDraw.Draw(tile).rectangle([cell_padding, cell_padding,
+                                        cell_size - cell_padding - 1, cell_size - cell_padding - 1], fill=255)
+        row = Image.new("L", (pixel_width, cell_size), 0)
+        for col in range(width):
+            row.paste(tile, (col * cell_size, 0))
+        self.mask = Image.new("L", (pixel_width, pixel_height), 0)
+        for r in range(height):
+            self.mask.paste(row, (0, r * cell_size))
+        self.built = (self.geometry, self.color_palette["primary"], self.color_palette["accent"])
+
+    def detach(self):
+        """Removes the board image when another renderer takes over."""
+        self.canvas.delete("board_image")
+        self.item = None
+        self.grid_layer.show()
+        self.invalidate()
+
+    def render(self, cells):
+        """
+        Paints the given live cells into the board image.
+
+        Args:
+            cells (iterable): The live (row, col) cells.
+        """
+        width, height, cell_size, _ = self.geometry
+        if not width or not height:
+            return
+        pixels = bytearray(width * height)
+        for row, col in cells:
+            if 0 <= row < height and 0 <= col < width:
+                pixels[row * width + col] = 255
+        board = Image.frombytes("L", (width, height), bytes(pixels))
+        board = board.resize((width * cell_size, height * cell_size), Image.NEAREST)
+
+        self.frame = self.background.copy()
+        self.frame.paste(self.color_palette["secondary"], (0, 0) + board.size,
+                         ImageChops.multiply(board, self.mask))
+        self.photo.paste(self.frame)
+
+    def show_cells(self, cells):
+        """Paints a batch of cells onto the current frame, updating the image once."""
+        _, _, cell_size, cell_padding = self.geometry
+        for row, col in cells:
+            box = (col * cell_size + cell_padding, row * cell_size + cell_padding,
+                   (col + 1) * cell_size - cell_padding, (row + 1) * cell_size - cell_padding)
+            self.frame.paste(self.color_palette["secondary"], box)
+        self.photo.paste(self.frame)
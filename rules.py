@@ -0,0 +1,128 @@
+"""
+Life-like rules: which neighbour counts bring a dead cell to life (B) and
+which keep a live cell alive (S), written as rulestrings like "B3/S23".
+
+A rule is parsed once into a transition table indexed by
+alive * 9 + neighbours, so the engines look the next state up instead
+of testing counts cell by cell. Rules are cached by rulestring; every
+engine running the same rule shares one table.
+"""
+import re
+
+# Named rules for the rule selector.
+RULES = {
+    "Life": "B3/S23",
+    "HighLife": "B36/S23",
+    "Seeds": "B2/S",
+    "Day & Night": "B3678/S34678",
+    "Life without Death": "B3/S012345678",
+    "2x2": "B36/S125",
+    "Maze": "B3/S12345",
+    "Replicator": "B1357/S1357",
+}
+DEFAULT_RULE = "B3/S23"
+
+_BS = re.compile(r"B([0-8]*)/?S([0-8]*)", re.IGNORECASE)
+_SB = re.compile(r"([0-8]*)/([0-8]*)")
+_SB_REVERSED = re.compile(r"S([0-8]*)/?B([0-8]*)", re.IGNORECASE)
+
+
+class Rule:
+    """
+    A Life-like rule compiled into a transition table. Build one with
+    parse_rule() so each rulestring is only compiled once.
+
+    Attributes:
+        birth (frozenset): Neighbour counts that bring a dead cell to life.
+        survival (frozenset): Neighbour counts that keep a live cell alive.
+        string (str): The rule in canonical "B.../S..." form.
+        table (bytes): 18 entries, 1 where alive * 9 + neighbours lives on.
+    """
+    def __init__(self, birth, survival):
+        self.birth = frozenset(birth)
+        self.survival = frozenset(survival)
+        self.string = "B{}/S{}".format("".join(map(str, sorted(self.birth))),
+                                       "".join(map(str, sorted(self.survival))))
+        self.table = bytes([1 if n in self.birth else 0 for n in range(9)] +
+                           [1 if n in self.survival else 0 for n in range(9)])
+
+    @property
+    def masks(self):
+        """(birth, survival) as 9 bit masks, bit n for n neighbours."""
+        return (sum(1 << n for n in self.birth), sum(1 << n for n in self.survival))
+
+    @classmethod
+    def from_masks(cls, birth, survival):
+        return parse_rule(cls([n for n in range(9) if birth >> n & 1],
+                              [n for n in range(9) if survival >> n & 1]).string)
+
+    def __str__(self):
+        return self.string
+
+    def __repr__(self):
+        return f"Rule({self.string!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and self.string == other.string
+
+    def __hash__(self):
+        return hash(self.string)
+
+
+_compiled = {}
+
+
+def parse_rule(text):
+    """
+    Compiles a rulestring, or returns the rule already compiled for it.
+
+    Args:
+        text (str or Rule): "B36/S23", "b36s23", "S23/B36" or the old
+            survival/birth form "23/36". A Rule is returned as it is.
+
+    Returns:
+        Rule: The compiled rule.
+
+    Raises:
+        ValueError: If the rulestring is not a Life-like rule, or uses
+            B0, which would bring the whole infinite background to life.
+    """
+    if isinstance(text, Rule):
+        return text
+    key = text.strip()
+    rule = _compiled.get(key)
+    if rule is not None:
+        return rule
+
+    compact = key.replace(" ", "")
+    match = _BS.fullmatch(compact)
+    if match:
+        birth, survival = match.groups()
+    else:
+        match = _SB_REVERSED.fullmatch(compact) or _SB.fullmatch(compact)
+        if not match:
+            raise ValueError(f"Not a Life-like rule: '{text}'")
+        survival, birth = match.groups()
+    if "0" in birth:
+        raise ValueError(f"B0 rules are not supported: '{text}'")
+
+    rule = Rule([int(n) for n in birth], [int(n) for n in survival])
+    rule = _compiled.setdefault(rule.string, rule)
+    _compiled[key] = rule
+    return rule
+
+
+def rule_name(rule):
+    """
+    Returns:
+        str: The name of a rule in RULES, or its rulestring.
+    """
+    rule = parse_rule(rule)
+    for name, string in RULES.items():
+        if parse_rule(string) == rule:
+            return name
+    return rule.string
+
+
+# Conway's Game of Life, the rule every engine starts with.
+CONWAY = parse_rule(DEFAULT_RULE)
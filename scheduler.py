@@ -0,0 +1,105 @@
+"""
+Pacing for the play loop: how many generations to compute on each display
+tick, so the simulation rate and the redraw rate can differ.
+"""
+import time
+from collections import deque
+
+
+class FrameScheduler:
+    """
+    Runs the simulation at a target number of generations per second while
+    drawing at most max_fps frames per second.
+
+    Every tick works out how many generations are due from the time that
+    passed, steps them (skipping the frames in between) and leaves the
+    redraw to the caller. If stepping falls behind, the backlog is capped
+    instead of growing forever, and the measured rates show what was
+    really achieved.
+
+    Attributes:
+        target_gps (float): Generations per second to aim for.
+        max_fps (float): Most frames per second to draw.
+        achieved_gps (float): Generations per second over the last second.
+        achieved_fps (float): Frames drawn per second over the last second.
+    """
+    def __init__(self, target_gps=5, max_fps=60, clock=time.perf_counter):
+        self.target_gps = target_gps
+        self.max_fps = max_fps
+        self.clock = clock
+        self.achieved_gps = 0.0
+        self.achieved_fps = 0.0
+        self.start()
+
+    def start(self):
+        """Resets the timer, e.g. when play is pressed."""
+        self._last = self.clock()
+        self._tick_start = self._last
+        # Owe one generation up front so play reacts on the first tick.
+        self._debt = 1.0
+        self._history = deque()
+
+    def frame_interval(self):
+        return 1.0 / self.max_fps
+
+    def tick(self, step):
+        """
+        Steps the generations that are due since the last tick, giving up
+        on the rest once a frame's worth of time is spent.
+
+        Args:
+            step (callable): Advances the simulation by one generation, or
+                returns False if no generation is ready yet.
+
+        Returns:
+            int: The number of generations stepped; 0 means nothing to redraw.
+        """
+        now = self.clock()
+        self._tick_start = now
+        self._debt += (now - self._last) * self.target_gps
+        self._last = now
+        # Never owe more than a quarter second of generations, so a slow
+        # board does not pile up a backlog it can never catch up on.
+        self._debt = min(self._debt, max(1.0, self.target_gps / 4))
+
+        due = int(self._debt)
+        budget = now + self.frame_interval() * 0.8
+        done = 0
+        while done < due:
+            if step() is False:
+                break
+            done += 1
+            if self.clock() > budget:
+                break
+        self._debt -= done
+        if done < due:
+            self._debt = 0.0
+        return done
+
+    def frame_done(self, generations):
+        """
+        Records a finished tick for the achieved rates.
+
+        Args:
+            generations (int): Generations stepped in the tick.
+        """
+        now = self.clock()
+        history = self._history
+        history.append((now, generations))
+        while history and now - history[0][0] > 1.0:
+            history.popleft()
+        span = now - history[0][0] if len(history) > 1 else 0
+        if span > 0:
+            self.achieved_gps = sum(g for _, g in list(history)[1:]) / span
+            self.achieved_fps = sum(1 for _, g in list(history)[1:] if g) / span
+
+    def delay_ms(self):
+        """
+        Returns:
+            int: Milliseconds to wait before the next tick.
+        """
+        spent = self.clock() - self._tick_start
+        # Slow targets wake up when the next generation is due rather than
+        # polling at the full frame rate.
+        interval = max(self.frame_interval(), min(1.0 / self.target_gps, 0.25) - 0.001)
+        return max(1, int((interval - spent) * 1000))
@@ -0,0 +1,397 @@
+"""
+Headless Game of Life core: the board, its engine, stepping and
+load/save. Nothing here imports Tkinter or pygame, so it can run on a
+server or in a batch job; the GUI in gol.py is a thin client of it.
+"""
+import random
+from array import array
+from contextlib import contextmanager
+import formats
+import patterns
+from cycles import CycleDetector
+from engines import create_engine, default_engine
+from hashlife import HashLifeEngine
+from rules import CONWAY, parse_rule
+
+
+# Longest cycle loop mode stores and replays; longer ones keep stepping.
+LOOP_MAX_PERIOD = 64
+
+
+class Simulation:
+    """
+    A Game of Life board driven by one of the engines. With a bounded
+    engine the board is width x height; with the Unbounded engine the
+    universe is infinite and width x height is only its home area.
+
+    Attributes:
+        width (int): Number of columns on the board.
+        height (int): Number of rows on the board.
+        cell_size (int): Cell size in pixels, kept so saved states
+            reopen at the same zoom.
+        engine (engines.Engine): The backend holding the live cells.
+        rule (rules.Rule): The Life-like rule the board evolves by.
+        generation (int): Generations stepped since the last load or clear.
+        cycles (cycles.CycleDetector): Follows the board to spot cycles,
+            or None when detection is off.
+        loop_cycles (bool): Once a cycle is found, store one period of it
+            and replay that instead of stepping.
+        last_changed (iterable): The packed cells the last generation
+            stepped flipped, when changes are tracked (see
+            track_changes()); otherwise None.
+    """
+    def __init__(self, width=0, height=0, cell_size=20, engine=None, rule=None):
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.rule = parse_rule(rule or CONWAY)
+        self.engine = create_engine(engine or default_engine())
+        self.engine.set_rule(self.rule)
+        self.engine.resize(width, height)
+        self.generation = 0
+        self.hashlife = None
+        self.cycles = None
+        self.loop_cycles = False
+        self._loop = []
+        self._loop_start = 0
+        # Packed cells that flipped since take_changes(), or None when
+        # changes are not tracked.
+        self._changed = None
+        self.last_changed = None
+
+    def track_changes(self, enabled=True):
+        """
+        Starts or stops noting which cells every change to the board flips,
+        for take_changes(). Edits and steps note just the cells they touch;
+        loads, clears and other whole-board changes compare the board
+        before and after, so batch runs that never ask pay nothing.
+        """
+        self._changed = set() if enabled else None
+
+    def take_changes(self):
+        """
+        Returns:
+            array: The cells that flipped since the last call, born or
+                died, as array("q") of packed cells (see engines.pack()),
+                or None if changes are not tracked.
+        """
+        changed = self._changed
+        if changed is None:
+            return None
+        self._changed = set()
+        return array("q", changed)
+
+    def _note(self, keys):
+        if self._changed is not None:
+            self._changed.symmetric_difference_update(keys)
+
+    @contextmanager
+    def _rewriting(self):
+        # Notes the cells a block that rewrites the whole board flipped.
+        if self._changed is None:
+            yield
+            return
+        before = self.engine.packed()
+        yield
+        self._changed ^= before ^ self.engine.packed()
+
+    def detect_cycles(self, enabled=True, loop=False):
+        """
+        Turns cycle detection on or off. Detection costs a little per
+        generation, in proportion to the cells that change.
+
+        Args:
+            enabled (bool): Whether to look for cycles.
+            loop (bool): Whether to replay a cycle once found, see loop_cycles.
+        """
+        self.cycles = CycleDetector() if enabled else None
+        self.loop_cycles = enabled and loop
+        self._loop = []
+
+    def _forget_cycle(self):
+        # Whatever was found is about a board that no longer exists.
+        if self.cycles is not None:
+            self.cycles.reset()
+        self._loop = []
+
+    def resize(self, width, height):
+        """Changes the board size, keeping the cells that still fit."""
+        if (width, height) != (self.width, self.height):
+            self._forget_cycle()
+        self.width = width
+        self.height = height
+        if self.engine.bounded:
+            # Cells that no longer fit may go.
+            with self._rewriting():
+                self.engine.resize(width, height)
+        else:
+            self.engine.resize(width, height)
+
+    def set_engine(self, name):
+        """
+        Switches the simulation backend, carrying the current cells over.
+
+        Args:
+            name (str): One of the names in engines.ENGINES.
+        """
+        if name == self.engine.name:
+            return
+        engine = create_engine(name)
+        engine.set_rule(self.rule)
+        engine.load(self.engine.cells(), self.width, self.height)
+        with self._rewriting():
+            self.engine.close()
+            self.engine = engine
+        self._forget_cycle()
+
+    def set_rule(self, rule):
+        """
+        Switches to another Life-like rule, keeping the cells.
+
+        Args:
+            rule (str or rules.Rule): A rulestring such as "B36/S23".
+
+        Raises:
+            ValueError: If the rulestring is not a supported rule.
+        """
+        rule = parse_rule(rule)
+        if rule != self.rule:
+            self.rule = rule
+            self.engine.set_rule(rule)
+            self._forget_cycle()
+
+    @property
+    def bounded(self):
+        return self.engine.bounded
+
+    def in_bounds(self, row, col):
+        return self.engine.in_bounds(row, col)
+
+    def cells(self):
+        return self.engine.cells()
+
+    def cells_in(self, top, left, height, width):
+        """Lists the live cells inside a rectangle, e.g. the visible part."""
+        return self.engine.cells_in(top, left, height, width)
+
+    def population(self):
+        return self.engine.population()
+
+    def is_alive(self, row, col):
+        return self.engine.is_alive(row, col)
+
+    def set_cell(self, row, col, alive=True):
+        engine = self.engine
+        if engine.in_bounds(row, col):
+            if self._changed is not None and engine.is_alive(row, col) != alive:
+                self._changed ^= {(row << 32) + col}
+            engine.set_cell(row, col, alive)
+            self._forget_cycle()
+
+    def flip(self, cells):
+        """
+        Brings dead cells to life and kills live ones, e.g. to take back a
+        change. Cells off a bounded board are left out.
+
+        Args:
+            cells (iterable): (row, col) of the cells to flip.
+        """
+        engine = self.engine
+        flipped = []
+        for row, col in cells:
+            if engine.in_bounds(row, col):
+                engine.set_cell(row, col, not engine.is_alive(row, col))
+                flipped.append((row << 32) + col)
+        self._note(flipped)
+        self._forget_cycle()
+
+    def clear(self):
+        with self._rewriting():
+            self.engine.clear()
+        self.generation = 0
+        self._forget_cycle()
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: The generation and an engine snapshot of the board.
+        """
+        return (self.generation, self.engine.snapshot())
+
+    def restore(self, snapshot, changes=None):
+        """
+        Puts the board back to a snapshot() of the same engine type.
+
+        Args:
+            snapshot (tuple): The generation and the engine snapshot.
+            changes (iterable, optional): The packed cells that differ
+                between the board and the snapshot, if known, so tracked
+                changes do not need the whole board compared.
+        """
+        self.generation, board = snapshot
+        if changes is not None:
+            self.engine.restore(board)
+            self._note(changes)
+        else:
+            with self._rewriting():
+                self.engine.restore(board)
+        self.width = self.engine.width
+        self.height = self.engine.height
+        self._forget_cycle()
+
+    def step(self, generations=1):
+        self.last_changed = None
+        if self.cycles is None:
+            if self._changed is None:
+                self.engine.step(generations)
+            else:
+                for _ in range(generations):
+                    self.engine.step()
+                    self.last_changed = self.engine.changed()
+                    self._note(self.last_changed)
+            self.generation += generations
+            return
+        for _ in range(generations):
+            self._step_tracked()
+
+    def _step_tracked(self):
+        cycles = self.cycles
+        period = cycles.period
+        looping = self.loop_cycles and period is not None and period <= LOOP_MAX_PERIOD
+        if looping and len(self._loop) == period:
+            # The whole cycle is stored; replay it instead of computing it.
+            self.generation += 1
+            board, changed = self._loop[(self.generation - self._loop_start) % period]
+            self.engine.restore(board)
+            # Each stored frame keeps the flips that led to it; on a cycle
+            # they also lead from the last frame back to the first.
+            self._note(changed)
+            self.last_changed = changed
+            return
+
+        if cycles.hash is None:
+            cycles.start(self.engine.cells(), self.generation)
+        self.engine.step()
+        self.generation += 1
+        period = cycles.update(self.engine.flips(), self.generation) or period
+        storing = self.loop_cycles and period is not None and period <= LOOP_MAX_PERIOD
+        if storing or self._changed is not None:
+            changed = self.engine.changed()
+            self._note(changed)
+            self.last_changed = changed
+        if storing:
+            if not self._loop:
+                self._loop_start = self.generation
+            self._loop.append((self.engine.snapshot(), changed))
+
+    def jump(self, k):
+        """
+        Jumps 2**k generations ahead.
+
+        On an unbounded universe this runs HashLife, which keeps its node
+        cache between jumps, so repeated jumps on the same pattern get
+        faster. HashLife's universe has no edges, so it would not give the
+        result a bounded board steps to; bounded boards step all 2**k
+        generations with their own engine instead, which takes time in
+        proportion to 2**k.
+
+        Args:
+            k (int): The power of two to advance by.
+        """
+        if self.engine.bounded:
+            self.step(1 << k)
+            return
+        if self.hashlife is None:
+            self.hashlife = HashLifeEngine()
+        self.hashlife.set_rule(self.rule)
+        self.hashlife.load(self.engine.cells(), self.width, self.height)
+        self.hashlife.jump(k)
+        with self._rewriting():
+            self.engine.load(self.hashlife.cells(), self.width, self.height)
+        self.generation += 1 << k
+        self._forget_cycle()
+
+    def randomize(self, rng=random):
+        """
+        Replaces the board with a random soup centred on the board, covering
+        25-50% of its smaller side.
+
+        Args:
+            rng (random.Random): Source of randomness, for seeded soups.
+        """
+        self.clear()
+        if not self.width or not self.height:
+            return
+
+        # Calculate the center of the grid
+        center_row = self.height // 2
+        center_col = self.width // 2
+
+        # Calculate the maximum size of the random pattern (25-50% of total grid size)
+        max_size = int(min(self.width, self.height) * rng.uniform(0.25, 0.5))
+
+        # Generate random cells within the calculated area
+        with self._rewriting():
+            for _ in range(max_size * max_size // 4):  # Using a quarter of max_size^2 for sparser population
+                row_offset = rng.randint(-max_size//2, max_size//2)
+                col_offset = rng.randint(-max_size//2, max_size//2)
+                row = (center_row + row_offset) % self.height
+                col = (center_col + col_offset) % self.width
+                self.engine.set_cell(row, col, True)
+
+    def to_state(self):
+        """
+        Returns:
+            dict: The board in the save file layout. Cells of an unbounded
+                universe keep their coordinates, even off the home area,
+                rather than growing the board to cover them all.
+        """
+        return {
+            "cell_size": self.cell_size,
+            "grid": list(self.engine.cells()),
+            "width": self.width,
+            "height": self.height,
+            "rule": self.rule.string
+        }
+
+    def load_state(self, state):
+        """
+        Replaces the board with a state in the save file layout.
+
+        Args:
+            state (dict): A dict with cell_size, grid, width, height and
+                rule. cell_size may be missing, e.g. from an RLE file, and
+                rule from saves older than rules; both then stay as they are.
+                A bounded board leaves out cells outside width x height.
+        """
+        if state.get("rule"):
+            self.set_rule(state["rule"])
+        self.cell_size = state.get("cell_size", self.cell_size)
+        self.width = state["width"]
+        self.height = state["height"]
+        with self._rewriting():
+            self.engine.load(state["grid"], self.width, self.height)
+        self.generation = 0
+        self._forget_cycle()
+
+    def load_pattern(self, name, library=None):
+        """
+        Loads a pattern from the pattern library by name.
+
+        Args:
+            name (str): A name from the library index.
+            library (patterns.PatternLibrary, optional): Defaults to the
+                library shipped in assets/patterns.
+        """
+        self.load_state((library or patterns.default_library()).load(name))
+
+    def save(self, file_path, fmt=None):
+        """
+        Writes the board to a file; the format follows the extension
+        (.json, .gol or .rle) unless fmt is given.
+        """
+        formats.save(self.to_state(), file_path, fmt)
+
+    def load(self, file_path):
+        """Reads a board saved in any of the formats in formats.py."""
+        self.load_state(formats.load(file_path))
@@ -0,0 +1,106 @@
+"""
+The app's music and sound effects, loaded off the Tk thread.
+
+Importing pygame, starting the mixer and decoding the music and effects
+takes a good part of startup, so it all happens on a background thread
+while the window comes up. Until it is done, effects are skipped and
+volume or music requests are remembered and applied once loading ends.
+If there is no audio device the app simply stays silent.
+"""
+import threading
+from startup import timeline
+from utils import resource_path
+
+MUSIC = "assets/music/lofi.mp3"
+EFFECTS = {
+    "click": "assets/music/s2.wav",
+    "remove": "assets/music/s1.wav",
+}
+
+
+class SoundBank:
+    """
+    Background music and named sound effects sharing one pygame mixer.
+
+    Attributes:
+        loaded (threading.Event): Set once loading finished, with or
+            without audio.
+        available (bool): Whether audio could be loaded.
+
+    Methods:
+        load_async():
+            Starts loading on a background thread.
+
+        play_music():
+            Loops the background music, now or as soon as it is loaded.
+
+        play(name):
+            Plays one of the EFFECTS, if loaded.
+
+        set_music_volume(volume):
+            Sets the music volume, 0 to 1.
+
+        set_effects_volume(volume):
+            Sets the volume of every effect, 0 to 1.
+    """
+    def __init__(self):
+        self.loaded = threading.Event()
+        self.available = False
+        self._lock = threading.Lock()
+        self._mixer = None
+        self._effects = {}
+        self._music_wanted = False
+        self._music_volume = 1
+        self._effects_volume = 1
+        self._thread = None
+
+    def load_async(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._load, name="sound-loader", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        try:
+            with timeline.phase("import pygame"):
+                from pygame import mixer
+            with timeline.phase("audio init"):
+                # Another part of the app may have started the mixer already.
+                if not mixer.get_init():
+                    mixer.init()
+                mixer.music.load(resource_path(MUSIC))
+                effects = {name: mixer.Sound(resource_path(path)) for name, path in EFFECTS.items()}
+            with self._lock:
+                mixer.music.set_volume(self._music_volume)
+                for effect in effects.values():
+                    effect.set_volume(self._effects_volume)
+                if self._music_wanted:
+                    mixer.music.play(-1)
+                self._mixer = mixer
+                self._effects = effects
+                self.available = True
+        except Exception:  # No pygame, no audio device or missing files: play silently
+            pass
+        self.loaded.set()
+
+    def play_music(self):
+        with self._lock:
+            self._music_wanted = True
+            if self._mixer is not None:
+                self._mixer.music.play(-1)
+
+    def play(self, name):
+        effect = self._effects.get(name)
+        if effect is not None:
+            effect.play()
+
+    def set_music_volume(self, volume):
+        with self._lock:
+            self._music_volume = volume
+            if self._mixer is not None:
+                self._mixer.music.set_volume(volume)
+
+    def set_effects_volume(self, volume):
+        with self._lock:
+            self._effects_volume = volume
+            for effect in self._effects.values():
+                effect.set_volume(volume)
@@ -0,0 +1,197 @@
+"""
+Batch soup experiments: run many seeded random soups until they settle.
+
+Every soup is laid out like the Randomize button does, from its own
+seed, and stepped with cycle detection until it repeats or reaches the
+generation cap. Soups run in a process pool, and each result is written
+to the output file as soon as it comes in, so a long run can be watched
+or stopped at any time.
+
+Example:
+    python soups.py -n 10000 -o soups.csv --size 64 --max-generations 5000
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from engines import TiledEngine, available_engines
+from rules import parse_rule
+from simulation import Simulation
+
+FIELDS = ["seed", "width", "height", "rule", "initial_population", "stabilised", "lifespan", "period",
+          "generations", "final_population", "top", "left", "bottom", "right"]
+# Soups queued per worker, enough to keep every worker busy.
+QUEUED_PER_WORKER = 4
+# Seconds between progress lines on stderr.
+PROGRESS_INTERVAL = 5
+
+
+def run_soup(seed, width, height, engine, rule, max_generations):
+    """
+    Runs one soup until it repeats or hits the cap.
+
+    Args:
+        seed (int): Seed for the soup's layout.
+        width (int): Board width.
+        height (int): Board height.
+        engine (str): Engine to step with.
+        rule (str): Rulestring to run.
+        max_generations (int): Generation cap.
+
+    Returns:
+        dict: The FIELDS of the soup. lifespan is the generation its
+            final cycle started at (None if it never settled), and top,
+            left, bottom and right bound the final live cells (None when
+            the board died out).
+    """
+    sim = Simulation(width, height, engine=engine, rule=rule)
+    try:
+        sim.randomize(random.Random(seed))
+        initial_population = sim.population()
+        sim.detect_cycles(True)
+        cycles = sim.cycles
+        while cycles.period is None and sim.generation < max_generations:
+            sim.step()
+
+        cells = list(sim.cells())
+        rows = [row for row, _ in cells]
+        cols = [col for _, col in cells]
+        stabilised = cycles.period is not None
+        return {
+            "seed": seed,
+            "width": width,
+            "height": height,
+            "rule": sim.rule.string,
+            "initial_population": initial_population,
+            "stabilised": stabilised,
+            "lifespan": cycles.found_at - cycles.period if stabilised else None,
+            "period": cycles.period,
+            "generations": sim.generation,
+            "final_population": len(cells),
+            "top": min(rows) if cells else None,
+            "left": min(cols) if cells else None,
+            "bottom": max(rows) if cells else None,
+            "right": max(cols) if cells else None,
+        }
+    finally:
+        sim.engine.close()
+
+
+class ResultWriter:
+    """
+    Streams soup results to a CSV or JSON lines file, picked by the
+    extension (.csv, or .jsonl / .json for JSON lines).
+    """
+    def __init__(self, path):
+        self._file = open(path, "w", newline="")
+        self._csv = None
+        if not path.lower().endswith((".jsonl", ".json")):
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            self._csv.writeheader()
+
+    def write(self, result):
+        if self._csv is not None:
+            self._csv.writerow(result)
+        else:
+            self._file.write(json.dumps(result) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run_batch(seeds, width, height, engine, rule, max_generations, workers, on_result):
+    """
+    Runs soups in a process pool, handing each result to on_result as
+    it finishes, so results come in completion order, not seed order.
+
+    Returns:
+        int: The number of soups run.
+    """
+    done = 0
+    seeds = iter(seeds)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            # Only queue a few soups ahead, so a huge batch never sits in memory.
+            while len(pending) < workers * QUEUED_PER_WORKER:
+                seed = next(seeds, None)
+                if seed is None:
+                    break
+                pending.add(pool.submit(run_soup, seed, width, height, engine, rule, max_generations))
+            if not pending:
+                return done
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                on_result(future.result())
+                done += 1
+
+
+def parse_args(argv=None):
+    engines = [name for name in available_engines() if name != TiledEngine.name]
+    parser = argparse.ArgumentParser(description="Run seeded random soups until they settle.")
+    parser.add_argument("-o", "--output", required=True,
+                        help="file for the per-soup results: .csv, or .jsonl for JSON lines")
+    parser.add_argument("-n", "--soups", type=int, default=1000, help="number of soups (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first soup; the rest count up from it (default: %(default)s)")
+    parser.add_argument("--size", type=int, default=64, help="board width and height (default: %(default)s)")
+    parser.add_argument("-g", "--max-generations", type=int, default=5000,
+                        help="give up on a soup after this many generations (default: %(default)s)")
+    parser.add_argument("-e", "--engine", default="Sparse", choices=engines,
+                        help="simulation engine to use (default: %(default)s)")
+    parser.add_argument("-r", "--rule", default="B3/S23", help="Life-like rule to run (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        parse_rule(args.rule)
+    except ValueError as error:
+        parser.error(str(error))
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    writer = ResultWriter(args.output)
+    stats = {"done": 0, "stabilised": 0, "lifespans": 0, "periods": {}}
+    start = time.perf_counter()
+    last_report = [start]
+
+    def on_result(result):
+        writer.write(result)
+        stats["done"] += 1
+        if result["stabilised"]:
+            stats["stabilised"] += 1
+            stats["lifespans"] += result["lifespan"]
+            stats["periods"][result["period"]] = stats["periods"].get(result["period"], 0) + 1
+        now = time.perf_counter()
+        if now - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = now
+            print(f"  {stats['done']}/{args.soups} soups, {stats['done'] / (now - start):.1f} soups/s",
+                  file=sys.stderr)
+
+    try:
+        done = run_batch(range(args.seed, args.seed + args.soups), args.size, args.size, args.engine,
+                         args.rule, args.max_generations, args.workers, on_result)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    settled = stats["stabilised"]
+    print(f"{done} soups on {args.size}x{args.size} boards in {elapsed:.2f}s "
+          f"({done / elapsed:.1f} soups/s with {args.workers} workers)")
+    print(f"{settled} settled within {args.max_generations} generations"
+          + (f", mean lifespan {stats['lifespans'] / settled:.0f}" if settled else ""))
+    common = sorted(stats["periods"].items(), key=lambda item: -item[1])[:5]
+    if common:
+        print("Most common periods: " + ", ".join(f"p{period} x{count}" for period, count in common))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Startup timeline: how long each phase of launching the app takes, from
+the moment this module is first imported (main.py imports it first).
+
+Phases can run on any thread, so background loading shows up next to
+the work on the Tk thread. Run main.py with --startup-report to print
+the timeline once the menu is interactive and again when a game starts.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimeline:
+    """
+    Collects timed phases and one-off marks relative to an origin.
+
+    Attributes:
+        origin (float): Clock value everything is measured from.
+        phases (list): (name, start, end, thread) of finished phases, in
+            seconds since origin.
+        marks (list): (name, time) of marks such as "interactive".
+    """
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        self.phases = []
+        self.marks = []
+        self._running = {}
+
+    def now(self):
+        return self.clock() - self.origin
+
+    @contextmanager
+    def phase(self, name):
+        """Times the code in a with block as one phase."""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def begin(self, name):
+        """Starts a phase that ends in another callback, e.g. the intro."""
+        self._running[name] = self.now()
+
+    def end(self, name):
+        start = self._running.pop(name, None)
+        if start is not None:
+            self.phases.append((name, start, self.now(), threading.current_thread().name))
+
+    def mark(self, name):
+        self.marks.append((name, self.now()))
+
+    def report(self):
+        """
+        Returns:
+            str: The phases and marks in start order, in milliseconds.
+        """
+        rows = [(start, f"{start * 1000:9.1f} ms  {(end - start) * 1000:8.1f} ms  {name}"
+                        + (f"  [{thread}]" if thread != "MainThread" else ""))
+                for name, start, end, thread in self.phases]
+        rows += [(start, f"{start * 1000:9.1f} ms  {'(running)':>11}  {name}")
+                 for name, start in list(self._running.items())]
+        rows += [(at, f"{at * 1000:9.1f} ms  {'':11}  * {name}") for name, at in self.marks]
+        lines = ["    start     duration  phase"] + [line for _, line in sorted(rows)]
+        return "\n".join(lines)
+
+
+# The timeline of this process.
+timeline = StartupTimeline()
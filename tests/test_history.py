@@ -0,0 +1,17 @@
+from history import History
+from simulation import Simulation
+
+
+def test_previous_frame_stops_when_the_step_was_evicted():
+    sim = Simulation(20, 20, engine="Sparse")
+    history = History(max_bytes=600)
+    history.push(sim)
+    for col in range(3):
+        sim.set_cell(10, 5 + col)
+    history.push(sim)
+    sim.step()
+    history.push(sim, stepped=True)
+    # Unpushed edits big enough to push the step out of the budget.
+    for row in range(20):
+        sim.set_cell(row, 0)
+    assert history.previous_frame(sim) is False
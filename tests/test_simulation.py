@@ -0,0 +1,54 @@
+import pytest
+from engines import available_engines
+from hashlife import HashLifeEngine
+from simulation import Simulation
+
+
+def gun(engine):
+    # On the pattern's own board the gun's gliders reach the edge.
+    sim = Simulation(engine=engine)
+    sim.load_pattern("Gosper Glider Gun")
+    return sim
+
+
+@pytest.mark.parametrize("engine", available_engines())
+def test_jump_matches_stepping(engine):
+    jumped = gun(engine)
+    stepped = gun(engine)
+    try:
+        jumped.jump(8)
+        stepped.step(256)
+        assert jumped.generation == stepped.generation == 256
+        assert set(jumped.cells()) == set(stepped.cells())
+    finally:
+        jumped.engine.close()
+        stepped.engine.close()
+
+
+def test_bounded_board_differs_from_clipped_universe():
+    # Without this the test above would pass for a clipping jump too.
+    sim = gun("Sparse")
+    hashlife = HashLifeEngine()
+    hashlife.load(sim.cells(), sim.width, sim.height)
+    hashlife.jump(8)
+    sim.step(256)
+    assert set(hashlife.cells_in(0, 0, sim.height, sim.width)) != set(sim.cells())
+
+
+@pytest.mark.parametrize("extension", [".json", ".gol", ".rle"])
+def test_unbounded_save_keeps_far_cells(tmp_path, extension):
+    # A bitmap covering these cells would take hundreds of gigabytes.
+    cells = {(-5, -7), (3, 4), (1_000_000, 2_000_000)}
+    sim = Simulation(40, 30, engine="Unbounded")
+    for cell in cells:
+        sim.set_cell(*cell)
+    path = str(tmp_path / f"universe{extension}")
+    sim.save(path)
+
+    loaded = Simulation(engine="Unbounded")
+    loaded.load(path)
+    assert set(loaded.cells()) == cells
+    assert (loaded.width, loaded.height) == (40, 30)
+    bounded = Simulation(engine="Sparse")
+    bounded.load(path)
+    assert set(bounded.cells()) == {(3, 4)}
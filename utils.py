@@ -1,5 +1,5 @@
 import sys
-from os import path
+from os import environ, makedirs, path
 
 
 def resource_path(relative_path):
@@ -20,3 +20,22 @@ def resource_path(relative_path):
     """
     base_path = getattr(sys, '_MEIPASS', path.dirname(path.abspath(__file__)))
     return path.join(base_path, relative_path)
+
+
+def cache_path(name):
+    """
+    Get the path of a file in the per-user cache directory, creating the
+    directory if needed. Caches go here rather than next to the program,
+    which may be read-only or, under PyInstaller, a new folder every run.
+
+    Args:
+        name (str): The file name.
+
+    Returns:
+        str: %LOCALAPPDATA%\\GameOfLife\\<name> on Windows, otherwise
+            $XDG_CACHE_HOME/GameOfLife/<name> (~/.cache by default).
+    """
+    base = environ.get("LOCALAPPDATA") if sys.platform == "win32" else environ.get("XDG_CACHE_HOME")
+    directory = path.join(base or path.join(path.expanduser("~"), ".cache"), "GameOfLife")
+    makedirs(directory, exist_ok=True)
+    return path.join(directory, name)